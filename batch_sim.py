@@ -0,0 +1,316 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Vectorized Monte Carlo engine. Runs N independent
+sender/receiver pairs at once by keeping their state in NumPy arrays
+and advancing all of them together every tick. Same rules as
+Sender.receive / Receiver.receive (cumulative ACKs, receiver buffering,
+one timer, fast retransmit on the 3rd duplicate ACK), with independent
+random loss on every data packet and ACK.
+"""
+
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("batch_sim.py needs numpy (pip install numpy)")
+
+
+class BatchResult:
+    def __init__(self, completion, retransmits, timeouts, dup_acks, mean_latency,
+                 totalPackets, ticks, wall_time):
+        self.completion = completion      # tick each connection finished on (-1 = didn't)
+        self.retransmits = retransmits
+        self.timeouts = timeouts
+        self.dup_acks = dup_acks
+        self.mean_latency = mean_latency  # per connection: avg ticks from first send to in-order delivery
+        self.totalPackets = totalPackets
+        self.ticks = ticks                # ticks simulated in total
+        self.wall_time = wall_time
+
+    @property
+    def throughput(self):
+        # packets per tick for every connection that finished
+        done = self.completion > 0
+        return self.totalPackets / self.completion[done]
+
+    def summary(self, percentiles=(5, 25, 50, 75, 95, 99)):
+        done = self.completion > 0
+        out = {
+            "connections": len(self.completion),
+            "completed": int(done.sum()),
+            "ticks": self.ticks,
+            "wall_time": self.wall_time,
+        }
+        for name, values in (("completion", self.completion[done]),
+                             ("throughput", self.throughput),
+                             ("latency", self.mean_latency[done]),
+                             ("retransmits", self.retransmits)):
+            if len(values) == 0:
+                continue
+            out[f"{name}_mean"] = float(values.mean())
+            for p in percentiles:
+                out[f"{name}_p{p}"] = float(np.percentile(values, p))
+        return out
+
+
+class BatchSimulation:
+    def __init__(self, n, windowSize, timeoutInterval, totalPackets, delay,
+                 loss_data=0.0, loss_ack=0.0, seed=None, max_ticks=None):
+        self.n = n
+        self.W = windowSize
+        self.T = timeoutInterval
+        self.P = totalPackets
+        self.d = delay
+        self.loss_data = loss_data
+        self.loss_ack = loss_ack
+        self.max_ticks = max_ticks
+        self.rng = np.random.default_rng(seed)
+        self.now = 0
+
+        # sender state, one entry per connection
+        self.base = np.zeros(n, np.int64)
+        self.nextSeqNum = np.zeros(n, np.int64)
+        self.timerRunning = np.zeros(n, bool)
+        self.timerDeadline = np.zeros(n, np.int64)
+        self.dupAckCount = np.zeros(n, np.int32)
+
+        # receiver state. out-of-order packets can only be in
+        # [expectedSeqNum, expectedSeqNum + W), so the buffer is a ring of W bits
+        self.expectedSeqNum = np.zeros(n, np.int64)
+        self.buffer = np.zeros((n, windowSize), bool)
+        # when each seq in the window was first sent (for latency), same ring indexing
+        self.sendTime = np.zeros((n, windowSize), np.int64)
+
+        # the channel. sends on tick t arrive on t + delay, so a ring of
+        # delay + 1 slots is enough. each slot holds, per connection, the range
+        # of new segments [lo, hi) sent that tick, one retransmitted seq
+        # (or -1) and the ACKs the receiver sent: column 0 answers the
+        # retransmit, columns 1..W answer the range in order (-1 = none/lost).
+        D = delay + 1
+        self.D = D
+        self.data_lo = np.zeros((D, n), np.int64)
+        self.data_hi = np.zeros((D, n), np.int64)
+        self.data_rtx = np.full((D, n), -1, np.int64)
+        self.acks = np.full((D, n, windowSize + 1), -1, np.int64)
+
+        # stats
+        self.completion = np.full(n, -1, np.int64)
+        self.retransmits = np.zeros(n, np.int64)
+        self.timeouts = np.zeros(n, np.int64)
+        self.dupAcks = np.zeros(n, np.int64)
+        self.latency_sum = np.zeros(n, np.int64)
+
+        self.offsets = np.arange(windowSize)
+
+    # ---------------- receiver side ----------------
+
+    def walk_buffer(self, rows):
+        # like the `while self.expectedSeqNum in self.buffer` loop: keep
+        # moving expectedSeqNum forward while the next seq is buffered
+        W = self.W
+        while len(rows):
+            idx = self.expectedSeqNum[rows] % W
+            hit = self.buffer[rows, idx]
+            rows, idx = rows[hit], idx[hit]
+            self.buffer[rows, idx] = False
+            self.latency_sum[rows] += self.now - self.sendTime[rows, idx]
+            self.expectedSeqNum[rows] += 1
+
+    def receive_data(self, slot, ack_slot):
+        # only rows that actually have something arriving this tick are touched
+        W = self.W
+        exp = self.expectedSeqNum
+
+        # 1. the retransmitted segment (it was sent before the new ones that tick)
+        rtx = self.data_rtx[slot]
+        rows = np.flatnonzero(rtx >= 0)
+        if self.loss_data and len(rows):
+            rows = rows[self.rng.random(len(rows)) >= self.loss_data]
+        if len(rows):
+            seq = rtx[rows]
+            e = exp[rows]
+            ok = rows[seq == e]
+            self.latency_sum[ok] += self.now - self.sendTime[ok, exp[ok] % W]
+            exp[ok] += 1
+            self.walk_buffer(ok)
+            future = seq > e
+            self.buffer[rows[future], seq[future] % W] = True
+            ack = exp[rows]
+            if self.loss_ack:
+                ack = np.where(self.rng.random(len(rows)) < self.loss_ack, -1, ack)
+            self.acks[ack_slot, rows, 0] = ack
+
+        # 2. the range of new segments [lo, hi), all sent on the same tick
+        lo = self.data_lo[slot]
+        count = self.data_hi[slot] - lo
+        rows = np.flatnonzero(count > 0)
+        if len(rows):
+            lo, count, e = lo[rows], count[rows], exp[rows]
+            delivered = self.offsets < count[:, None]
+            if self.loss_data:
+                delivered &= self.rng.random((len(rows), W)) >= self.loss_data
+            # how many segments from the start of the range got through in a
+            # row. if the range starts right at expectedSeqNum those are
+            # accepted, otherwise everything gets buffered behind the gap.
+            run = np.where(delivered.all(axis=1), W, delivered.argmin(axis=1))
+            run = np.where(lo == e, run, 0)
+            # ACK for the k-th segment = expectedSeqNum right after handling it
+            ack = e[:, None] + np.minimum(self.offsets + 1, run[:, None])
+            sent_ack = delivered
+            if self.loss_ack:
+                sent_ack = delivered & (self.rng.random((len(rows), W)) >= self.loss_ack)
+            self.acks[ack_slot, rows, 1:] = np.where(sent_ack, ack, -1)
+
+            self.latency_sum[rows] += run * self.d # in-order ones took exactly `delay`
+            exp[rows] = e + run
+            r, k = np.nonzero(delivered & (self.offsets >= run[:, None]))
+            self.buffer[rows[r], (lo[r] + k) % W] = True
+
+        # clear the slot for reuse
+        self.data_lo[slot] = 0
+        self.data_hi[slot] = 0
+        self.data_rtx[slot] = -1
+
+    # ---------------- sender side ----------------
+
+    def retransmit(self, mask, send_slot):
+        # only the oldest unacked packet (base), like Sender.retransmit
+        mask = mask & (self.base < self.P)
+        self.data_rtx[send_slot][mask] = self.base[mask]
+        self.retransmits += mask
+
+    def receive_acks(self, slot, send_slot):
+        acks = self.acks[slot]
+        rows = np.flatnonzero((acks >= 0).any(axis=1))
+        if not len(rows):
+            return
+        # work on copies of just these rows, then write them back
+        base = self.base[rows]
+        nxt = self.nextSeqNum[rows]
+        dupCount = self.dupAckCount[rows]
+        running = self.timerRunning[rows]
+        deadline = self.timerDeadline[rows]
+        dups = np.zeros(len(rows), np.int64)
+        fast = np.zeros(len(rows), bool)
+
+        # ACKs have to be handled one after another since each one can move base
+        for a in acks[rows].T:
+            valid = a >= 0
+            new = valid & (a > base)
+            dup = valid & ~new & (a == base)
+
+            # new ACK: slide the window, reset dup count, restart the timer if
+            # there's still stuff in flight
+            base[new] = a[new]
+            dupCount[new] = 0
+            running[new] = base[new] < nxt[new]
+            deadline[new] = self.now + self.T
+
+            # duplicate ACK: the 3rd one triggers fast retransmit of base
+            dupCount[dup] += 1
+            dups += dup
+            fast |= dup & (dupCount == 3)
+
+        self.base[rows] = base
+        self.dupAckCount[rows] = dupCount
+        self.timerRunning[rows] = running
+        self.timerDeadline[rows] = deadline
+        self.dupAcks[rows] += dups
+        acks[rows] = -1
+        if fast.any():
+            mask = np.zeros(self.n, bool)
+            mask[rows[fast]] = True
+            self.retransmit(mask, send_slot)
+
+    def check_timers(self, send_slot):
+        expired = self.timerRunning & (self.now >= self.timerDeadline)
+        if expired.any():
+            self.timeouts += expired
+            self.retransmit(expired, send_slot)
+            self.timerDeadline[expired] = self.now + self.T
+
+    def fill_window(self, send_slot):
+        lo = self.nextSeqNum
+        hi = np.minimum(self.base + self.W, self.P)
+        count = hi - lo
+        sending = count > 0
+        if not sending.any():
+            return
+        # start the timer if the window was empty (base == nextSeqNum)
+        start = sending & (self.base == lo)
+        self.timerRunning[start] = True
+        self.timerDeadline[start] = self.now + self.T
+
+        r, k = np.nonzero(self.offsets < count[:, None])
+        self.sendTime[r, (lo[r] + k) % self.W] = self.now
+        self.data_lo[send_slot] = np.where(sending, lo, 0)
+        self.data_hi[send_slot] = np.where(sending, hi, 0)
+        self.nextSeqNum = np.maximum(lo, hi)
+
+    # ---------------- main loop ----------------
+
+    def step(self):
+        self.now += 1
+        slot = self.now % self.D
+        send_slot = (self.now + self.d) % self.D
+        # same order as the event simulator: arrivals, timers, then new sends
+        self.receive_data(slot, send_slot)
+        self.receive_acks(slot, send_slot)
+        self.check_timers(send_slot)
+        self.fill_window(send_slot)
+
+        finished = (self.base == self.P) & (self.completion < 0)
+        self.completion[finished] = self.now
+        self.timerRunning[self.base == self.P] = False
+
+    def run(self):
+        start = time.perf_counter()
+        self.fill_window(self.d % self.D)
+        while (self.completion < 0).any():
+            if self.max_ticks is not None and self.now >= self.max_ticks:
+                break
+            self.step()
+
+        delivered = np.maximum(self.expectedSeqNum, 1)
+        return BatchResult(
+            completion=self.completion.copy(),
+            retransmits=self.retransmits.copy(),
+            timeouts=self.timeouts.copy(),
+            dup_acks=self.dupAcks.copy(),
+            mean_latency=self.latency_sum / delivered,
+            totalPackets=self.P,
+            ticks=self.now,
+            wall_time=time.perf_counter() - start,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo of many independent connections.")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--timeout", type=int, default=150)
+    parser.add_argument("--packets", type=int, default=200)
+    parser.add_argument("--delay", type=int, default=60)
+    parser.add_argument("--loss", type=float, default=0.0, help="loss probability for data and ACKs")
+    parser.add_argument("--loss-data", type=float, default=None)
+    parser.add_argument("--loss-ack", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    loss_data = args.loss if args.loss_data is None else args.loss_data
+    loss_ack = args.loss if args.loss_ack is None else args.loss_ack
+    sim = BatchSimulation(args.connections, args.window, args.timeout, args.packets, args.delay,
+                          loss_data, loss_ack, seed=args.seed, max_ticks=args.max_ticks)
+    res = sim.run()
+    for key, value in res.summary().items():
+        print(f"{key:>18}: {value:,.3f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    return res
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Benchmarks for the headless simulator and the wire format. Run one with
+`python bench.py <name>` or all of them with `python bench.py all`.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from channel_models import build_models
+from checksum import HAVE_CRC32C, crc32c, internet_checksum
+from filetransfer import MSS
+from packet import Packet
+from multiplex import MultiFlowSimulation
+from simulation import Simulation
+from tracer import Tracer
+from wire import HEADER_SIZE, PacketEncoder, decode, encode
+
+# per-packet budgets the benchmarks check themselves against (bytes)
+PACKET_BYTES_BUDGET = 96        # one Packet object, payload not included
+SIM_PEAK_BYTES_PER_PACKET = 128 # peak traced memory of a whole run / packets sent
+
+
+def report(name, value, unit="", budget=None):
+    line = f"  {name:<34} {value:>14,.2f} {unit}"
+    if budget is not None:
+        line += f"   (budget {budget:,} -> {'OK' if value <= budget else 'OVER'})"
+    print(line)
+
+
+def bench_packet(count=200_000):
+    print(f"packet: allocating {count:,} Packet objects")
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    # same small seq for all of them so we don't also count fresh int objects
+    pkts = [Packet(7, False, -1, None) for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # only count what the Packet objects themselves cost, not the list holding them
+    stats = after.compare_to(before, "filename")
+    total = sum(s.size_diff for s in stats) - sys.getsizeof(pkts)
+    report("bytes per Packet", total / count, "B", PACKET_BYTES_BUDGET)
+    report("sys.getsizeof(Packet)", sys.getsizeof(pkts[0]), "B")
+    del pkts
+
+
+def bench_simulation(packets=100_000, window=256, delay=60, timeout=400):
+    print(f"simulation: {packets:,} packets, window {window}, delay {delay}")
+    sim = Simulation(window, timeout, packets, delay)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = sim.run()
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+
+    report("ticks", res.ticks)
+    report("wall time", wall, "s")
+    report("packets per second (wall)", packets / wall, "pkt/s")
+    report("peak traced memory", peak / 1024, "KiB")
+    # received_data keeps every payload, so most of this grows with the transfer
+    report("peak bytes per packet", peak / packets, "B", SIM_PEAK_BYTES_PER_PACKET)
+    report("live blocks left per packet", (blocks_after - blocks_before) / packets)
+
+
+def average_runs(seeds, **kwargs):
+    # run the same config over several seeds, return mean ticks / retransmits
+    ticks = retx = 0
+    model_args = kwargs.pop("model_args")
+    for seed in seeds:
+        res = Simulation(models=build_models(seed=seed, **model_args), **kwargs).run()
+        ticks += res.ticks
+        retx += res.retransmits
+    return ticks / len(seeds), retx / len(seeds)
+
+
+def bench_sack(packets=3000, window=32, delay=60, timeout=300, seeds=range(5)):
+    print(f"sack: {packets:,} packets, window {window}, delay {delay}, "
+          f"timeout {timeout}, mean of {len(seeds)} seeds")
+    print(f"  {'channel':<24} {'cumulative ticks':>17} {'SACK ticks':>11} {'speedup':>8} "
+          f"{'cum. rtx':>9} {'SACK rtx':>9}")
+    cases = [
+        ("1% random loss", {"loss": 0.01}),
+        ("5% random loss", {"loss": 0.05}),
+        ("burst loss", {"burst": (0.01, 0.3), "direction": "data"}),
+    ]
+    for name, model_args in cases:
+        common = dict(windowSize=window, timeoutInterval=timeout, totalPackets=packets, delay=delay)
+        base_ticks, base_rtx = average_runs(seeds, model_args=model_args, **common)
+        sack_ticks, sack_rtx = average_runs(seeds, model_args=model_args, sack=True, **common)
+        print(f"  {name:<24} {base_ticks:>17,.0f} {sack_ticks:>11,.0f} "
+              f"{base_ticks / sack_ticks:>7.2f}x {base_rtx:>9,.0f} {sack_rtx:>9,.0f}")
+
+
+def bench_rto(packets=3000, window=16, delay=60, seeds=range(5)):
+    print(f"rto: {packets:,} packets, window {window}, delay {delay} (RTT ~{2 * delay}), "
+          f"2% loss + jitter, mean of {len(seeds)} seeds")
+    print(f"  {'initial timeout':<16} {'fixed ticks':>12} {'adaptive ticks':>15} {'speedup':>8} "
+          f"{'fixed rtx':>10} {'adaptive rtx':>13}")
+    model_args = {"loss": 0.02, "jitter": (0, 30)}
+    for timeout in (100, 200, 500, 2000):
+        common = dict(windowSize=window, timeoutInterval=timeout, totalPackets=packets, delay=delay)
+        fixed_ticks, fixed_rtx = average_runs(seeds, model_args=model_args, **common)
+        ad_ticks, ad_rtx = average_runs(seeds, model_args=model_args, adaptive_rto=True, **common)
+        print(f"  {timeout:<16} {fixed_ticks:>12,.0f} {ad_ticks:>15,.0f} {fixed_ticks / ad_ticks:>7.2f}x "
+              f"{fixed_rtx:>10,.0f} {ad_rtx:>13,.0f}")
+
+
+def bench_cc(packets=20000, window=256, delay=60, timeout=300, seeds=range(3)):
+    print(f"cc: {packets:,} packets, window limit {window}, delay {delay}, adaptive RTO, "
+          f"mean of {len(seeds)} seeds (goodput in pkt/tick)")
+    print(f"  {'channel':<18} {'fixed window':>13} {'reno':>9} {'cubic':>9} "
+          f"{'reno avg cwnd':>14} {'cubic avg cwnd':>15}")
+    for name, model_args in (("no loss", {}), ("0.1% loss", {"loss": 0.001}),
+                             ("1% loss", {"loss": 0.01}), ("burst loss", {"burst": (0.002, 0.3)})):
+        goodput = {}
+        avg_cwnd = {}
+        for cc in (None, "reno", "cubic"):
+            total_goodput = total_cwnd = 0.0
+            for seed in seeds:
+                sim = Simulation(window, timeout, packets, delay, adaptive_rto=True, cc=cc,
+                                 models=build_models(seed=seed, **model_args))
+                res = sim.run()
+                total_goodput += res.goodput
+                if res.cc_history:
+                    # time weighted average of cwnd over the run
+                    hist = res.cc_history
+                    area = sum(c * (hist[i + 1][0] - t) for i, (t, c, _) in enumerate(hist[:-1]))
+                    total_cwnd += area / max(1, hist[-1][0] - hist[0][0])
+            goodput[cc] = total_goodput / len(seeds)
+            avg_cwnd[cc] = total_cwnd / len(seeds)
+        print(f"  {name:<18} {goodput[None]:>13.3f} {goodput['reno']:>9.3f} {goodput['cubic']:>9.3f} "
+              f"{avg_cwnd['reno']:>14.1f} {avg_cwnd['cubic']:>15.1f}")
+
+
+def bench_delack(packets=5000, window=32, delay=60, timeout=300, ack_delay=20, seeds=range(3)):
+    print(f"delack: {packets:,} packets, window {window}, delay {delay}, ACK timer {ack_delay} ticks, "
+          f"SACK + adaptive RTO, mean of {len(seeds)} seeds")
+    print(f"  {'channel':<18} {'cc':<6} {'ACKs':>8} {'delayed':>8} {'saved':>7} "
+          f"{'ticks':>8} {'delayed':>8} {'change':>7}")
+    for name, model_args in (("no loss", {}), ("1% loss", {"loss": 0.01}), ("burst loss", {"burst": (0.002, 0.3)})):
+        for cc in (None, "reno"):
+            acks = {}
+            ticks = {}
+            for delayed in (None, ack_delay):
+                total_acks = total_ticks = 0
+                for seed in seeds:
+                    sim = Simulation(window, timeout, packets, delay, sack=True, adaptive_rto=True, cc=cc,
+                                     delayed_ack=delayed, models=build_models(seed=seed, **model_args))
+                    res = sim.run()
+                    total_acks += res.acks
+                    total_ticks += res.ticks
+                acks[delayed] = total_acks / len(seeds)
+                ticks[delayed] = total_ticks / len(seeds)
+            print(f"  {name:<18} {cc or '-':<6} {acks[None]:>8,.0f} {acks[ack_delay]:>8,.0f} "
+                  f"{1 - acks[ack_delay] / acks[None]:>7.0%} {ticks[None]:>8,.0f} {ticks[ack_delay]:>8,.0f} "
+                  f"{ticks[ack_delay] / ticks[None] - 1:>+7.1%}")
+
+
+def bench_wire(count=200_000, mss=1400):
+    print(f"wire: encode/decode {count:,} segments of {mss} bytes")
+    data = memoryview(bytes(mss * 64))
+    pkts = [Packet(i, False, -1, data[(i % 64) * mss:(i % 64 + 1) * mss]) for i in range(count)]
+    encoder = PacketEncoder()
+
+    for label, fn in (("encode (reused header buffer)", lambda p: encoder.encode(p)),
+                      ("encode (joined bytes)", encode)):
+        start = time.perf_counter()
+        for p in pkts:
+            fn(p)
+        wall = time.perf_counter() - start
+        report(f"{label} ns/segment", wall / count * 1e9, "ns")
+        report(f"{label} MB/s", count * mss / wall / 1e6, "MB/s")
+
+    datagrams = [encode(p) for p in pkts[:1000]] * (count // 1000)
+    start = time.perf_counter()
+    for d in datagrams:
+        decode(d)
+    wall = time.perf_counter() - start
+    report("decode ns/segment", wall / len(datagrams) * 1e9, "ns")
+    report("decode MB/s", len(datagrams) * mss / wall / 1e6, "MB/s")
+
+    # the payload that comes out of decode should still be the datagram's memory
+    packet, _ = decode(datagrams[0])
+    report("payload bytes copied by decode", mss - (packet.data.obj is datagrams[0]) * mss, "B", 0)
+
+
+def bench_checksum(total_mb=256, packets=20000, window=64, delay=60, timeout=300, seeds=range(3)):
+    print(f"checksum: throughput over {total_mb} MB per buffer size")
+    for size in (64, 1400, 64 * 1024, 16 * 1024 * 1024):
+        buf = memoryview(os.urandom(size))
+        reps = max(1, total_mb * 1_000_000 // size)
+        start = time.perf_counter()
+        for _ in range(reps):
+            internet_checksum(buf)
+        wall = time.perf_counter() - start
+        report(f"inet, {size:,} B buffers", reps * size / wall / 1e9, "GB/s")
+    # without the crc32c package it's a pure Python loop, so keep that one small
+    size, reps = (1400, 2000) if HAVE_CRC32C else (1400, 20)
+    buf = memoryview(os.urandom(size))
+    start = time.perf_counter()
+    for _ in range(reps):
+        crc32c(buf)
+    wall = time.perf_counter() - start
+    backend = "crc32c package" if HAVE_CRC32C else "pure Python"
+    report(f"crc32c ({backend}), 1,400 B", reps * size / wall / 1e6, "MB/s")
+
+    print(f"  simulation: {packets:,} packets, window {window}, 1% corrupt, mean of {len(seeds)} seeds")
+    print(f"  {'checksum':<10} {'ticks':>10} {'wall (s)':>9} {'dropped':>8} {'delivered ok':>13}")
+    for name in ("none", "inet", "crc32c"):
+        ticks = wall = corrupted = good = 0
+        for seed in seeds:
+            sim = Simulation(window, timeout, packets, delay, checksum=name,
+                             models=build_models(corrupt=0.01, seed=seed))
+            res = sim.run()
+            ticks += res.ticks
+            wall += res.wall_time
+            corrupted += res.corrupted
+            # payloads that made it to the app layer intact
+            good += sum(1 for i, d in enumerate(sim.receiver.received_data)
+                        if (d if isinstance(d, str) else bytes(d).decode(errors="replace")) == f"Msg{i}")
+        n = len(seeds)
+        print(f"  {name:<10} {ticks / n:>10,.0f} {wall / n:>9.3f} {corrupted / n:>8,.0f} {good / n:>13,.0f}")
+
+
+def bench_mux(flows=100, packets=300, window=32, delay=30, timeout=300, bandwidth=20000, limit=100, seeds=range(3)):
+    print(f"mux: {flows} flows x {packets:,} packets over one {bandwidth:,} B/tick link, queue {limit}, "
+          f"SACK + adaptive RTO, mean of {len(seeds)} seeds")
+    print(f"  {'queue':<10} {'cc':<6} {'ticks':>9} {'goodput':>9} {'median':>8} {'jain':>6} {'drops':>7} {'wall s':>7}")
+    for queue in ("droptail", "red", "codel"):
+        for cc in ("reno", "cubic"):
+            rows = []
+            for seed in seeds:
+                sim = MultiFlowSimulation(flows, window, timeout, packets, delay, bandwidth=bandwidth,
+                                          queue=queue, queue_limit=limit, sack=True, adaptive_rto=True,
+                                          cc=cc, start_spread=2 * delay, seed=seed)
+                res = sim.run().as_dict()
+                rows.append([res["ticks"], res["goodput"], res["flow_goodput_median"], res["jain_index"],
+                             res.get("queue_drops", 0), res["wall_time"]])
+            ticks, goodput, median, jain, drops, wall = (sum(col) / len(seeds) for col in zip(*rows))
+            print(f"  {queue:<10} {cc:<6} {ticks:>9,.0f} {goodput:>9.3f} {median:>8.3f} {jain:>6.3f} "
+                  f"{drops:>7,.0f} {wall:>7.2f}")
+
+
+def bench_link(packets=20000, window=512, delay=60, timeout=300, bandwidth=2000, limit=300, seeds=range(3)):
+    # window well over the bandwidth-delay product, so a deep queue fills up (bufferbloat)
+    sim = Simulation(window, timeout, 1, delay, bandwidth=bandwidth)
+    bdp = sim.channel.link.bdp(2 * delay, HEADER_SIZE + MSS)
+    print(f"link: {packets:,} packets, window {window}, {bandwidth:,} B/tick link (BDP {bdp:.0f} packets), "
+          f"queue {limit}, SACK + adaptive RTO + Reno, mean of {len(seeds)} seeds")
+    print(f"  {'queue':<10} {'ticks':>8} {'goodput':>8} {'util':>6} {'avg queue':>10} {'avg sojourn':>12} "
+          f"{'max sojourn':>12} {'drops':>6}")
+    for queue in ("droptail", "red", "codel"):
+        rows = []
+        for seed in seeds:
+            sim = Simulation(window, timeout, packets, delay, sack=True, adaptive_rto=True, cc="reno",
+                             rwnd=2 * window, bandwidth=bandwidth, queue=queue, queue_limit=limit, seed=seed)
+            res = sim.run()
+            rows.append([res.ticks, res.goodput, res.link_utilization, res.avg_queue, res.avg_sojourn,
+                         res.max_sojourn, res.queue_drops])
+        ticks, goodput, util, avg_queue, avg_sojourn, max_sojourn, drops = (sum(col) / len(seeds) for col in zip(*rows))
+        print(f"  {queue:<10} {ticks:>8,.0f} {goodput:>8.3f} {util:>6.0%} {avg_queue:>10.1f} {avg_sojourn:>12.1f} "
+              f"{max_sojourn:>12.1f} {drops:>6,.0f}")
+
+
+def bench_trace(packets=100_000, window=256, delay=60, timeout=400, loss=0.01, repeats=3):
+    print(f"trace: {packets:,} packets, window {window}, {loss:.0%} loss, SACK, best of {repeats}")
+    print(f"  {'tracer':<12} {'wall s':>8} {'events':>10} {'ns/event':>9} {'overhead':>9}")
+    base = None
+    for name, capacity in (("off", None), ("ring 64K", 1 << 16), ("ring 4M", 1 << 22)):
+        best = None
+        for _ in range(repeats):
+            tracer = Tracer(capacity) if capacity else None
+            sim = Simulation(window, timeout, packets, delay, sack=True, tracer=tracer,
+                             models=build_models(loss=loss, seed=1))
+            res = sim.run()
+            if best is None or res.wall_time < best[0]:
+                best = (res.wall_time, (len(tracer) + tracer.overwritten) if tracer else 0)
+        wall, events = best
+        if base is None:
+            base = wall
+            print(f"  {name:<12} {wall:>8.3f} {'-':>10} {'-':>9} {'-':>9}")
+        else:
+            print(f"  {name:<12} {wall:>8.3f} {events:>10,} {(wall - base) / events * 1e9:>9.0f} "
+                  f"{wall / base - 1:>+9.1%}")
+
+
+BENCHES = {
+    "packet": bench_packet,
+    "simulation": bench_simulation,
+    "sack": bench_sack,
+    "rto": bench_rto,
+    "cc": bench_cc,
+    "delack": bench_delack,
+    "wire": bench_wire,
+    "checksum": bench_checksum,
+    "mux": bench_mux,
+    "link": bench_link,
+    "trace": bench_trace,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulator benchmarks.")
+    parser.add_argument("name", nargs="?", default="all", choices=["all"] + list(BENCHES))
+    args = parser.parse_args(argv)
+
+    names = list(BENCHES) if args.name == "all" else [args.name]
+    for name in names:
+        BENCHES[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,60 +6,238 @@ Description: Network channel simulator that handles propagation delay
 and the logic for manually dropping packets (loss).
 """
 
+import math
+from collections import deque
+
+from scheduler import EventScheduler, PRIORITY_ARRIVAL
+from tracer import CHANNEL, DROP, DROP_CONFIG, DROP_MODEL, DROP_QUEUE
+
 class Channel:
-    def __init__(self, loss_data, loss_ack, delay=1, log_callback=None):
-        # list to keep track of packets currently traveling.
-        # format: [packet, ticks_remaining, destination, total_delay]
-        self.in_transit = []         
+    def __init__(self, loss_data, loss_ack, delay=1, log_callback=None, verbose=True, scheduler=None, models=None,
+                 link=None, tracer=None):
+        # the channel owns the simulation clock. arrivals (and the sender's
+        # timer) are events on this scheduler, so time can jump between them.
+        self.scheduler = scheduler if scheduler is not None else EventScheduler()
+
+        # packets currently traveling, bucketed by the tick they arrive on.
+        # each bucket is a deque of [packet, arrival_time, destination, total_delay]
+        # and has exactly one arrival event in the scheduler.
+        self.buckets = {}
+        # id(packet) -> its transit entry, so killing a packet is a dict lookup.
+        # the receiver reuses one object for duplicate ACKs, so if the same packet
+        # is in flight more than once the newer copies wait in shared.
+        self.by_packet = {}
+        self.shared = {}
         self.loss_data = loss_data   # list of seq numbers to drop
         self.loss_ack = loss_ack     # list of ack numbers to drop
         self.delay = delay           
         self.log = log_callback      # function to write to the UI log
+        self.verbose = verbose       # turn off terminal prints for headless runs
+        self.trace = tracer          # structured event tracer (tracer.py) or None
+        # optional stochastic models (see channel_models.py), applied in order
+        self.models = list(models) if models else []
+        # optional bottleneck (see link.py) the data packets queue up for. ACKs
+        # are small and come back on the other direction, so they skip it.
+        self.link = link
+        self.dropCount = 0           # packets lost to config, models or a full queue
 
     def send_to_channel(self, packet, destination_obj):
         # first, check if this DATA packet is supposed to be lost based on config
         if not packet.isAck and packet.seqNum in self.loss_data:
             msg = f"DROP DATA {packet.seqNum} (Config)"
-            print(f"   >>> [CHANNEL] {msg}")
+            if self.verbose: print(f"   >>> [CHANNEL] {msg}")
             if self.log: self.log(msg, color=(255, 0, 0)) 
             
             # important: i have to remove this from the list. 
             # if i don't, the retransmission will just get dropped again and loop forever.
             self.loss_data.remove(packet.seqNum) 
+            self.dropCount += 1
+            if self.trace is not None:
+                self.trace.record(self.scheduler.now, DROP, CHANNEL, packet.seqNum, value=DROP_CONFIG)
             return 
             
         # next, check if this ACK packet is supposed to be lost
         if packet.isAck and packet.ackNum in self.loss_ack:
             msg = f"DROP ACK {packet.ackNum} (Config)"
-            print(f"   >>> [CHANNEL] {msg}")
+            if self.verbose: print(f"   >>> [CHANNEL] {msg}")
             if self.log: self.log(msg, color=(255, 0, 0)) 
             
             # same logic here, remove it so the next ack gets through
             self.loss_ack.remove(packet.ackNum)
+            self.dropCount += 1
+            if self.trace is not None:
+                self.trace.record(self.scheduler.now, DROP, CHANNEL, ack=packet.ackNum, value=DROP_CONFIG)
             return 
 
-        # if it wasn't dropped, add it to the transit list with the delay
-        self.in_transit.append([packet, self.delay, destination_obj, self.delay])
+        if not self.models and self.link is None:
+            self.enqueue(packet, destination_obj, self.delay)
+            return
+
+        packet, delays, dropped = self.route(packet, self.delay, self.models, self.link, self.scheduler.now)
+        if dropped is not None:
+            reason, name = dropped
+            self.dropCount += 1
+            if self.trace is not None:
+                self.trace_drop(packet, reason)
+            if self.log or self.verbose:
+                what = f"ACK {packet.ackNum}" if packet.isAck else f"DATA {packet.seqNum}"
+                msg = f"DROP {what} ({name})"
+                if self.verbose: print(f"   >>> [CHANNEL] {msg}")
+                if self.log: self.log(msg, color=(255, 0, 0))
+            return
+        for d in delays:
+            self.enqueue(packet, destination_obj, d)
+
+    @staticmethod
+    def route(packet, delay, models, link, now):
+        # what the network does to a packet sent at tick `now`, shared with
+        # MuxChannel and UdpChannel. returns (packet, delays, dropped): the
+        # packet as it arrives (a model may have altered it), one delay per
+        # copy counted from now, and (reason, name) if it got dropped.
+        # first the loss/jitter/reorder/duplicate models. each one maps the
+        # tuple of per-copy delays to a new one, empty means lost.
+        delays = (delay,)
+        for model in models:
+            if model.wants(packet):
+                delays = model.apply(packet, delays)
+                if not delays:
+                    return packet, delays, (DROP_MODEL, model.name)
+                if model.alters:
+                    packet = model.alter(packet)
+        if link is not None and not packet.isAck:
+            # wait in the queue and get serialized before it starts propagating
+            departure = link.admit(packet, now)
+            if departure is None:
+                return packet, (), (DROP_QUEUE, link.queue.name)
+            wait = math.ceil(departure) - now
+            delays = tuple(d + wait for d in delays)
+        return packet, delays, None
+
+    def trace_drop(self, packet, reason):
+        if packet.isAck:
+            self.trace.record(self.scheduler.now, DROP, CHANNEL, ack=packet.ackNum, value=reason)
+        else:
+            self.trace.record(self.scheduler.now, DROP, CHANNEL, packet.seqNum, value=reason)
+
+    def send_batch(self, packets, destination_obj):
+        # hand over a whole burst at once. with no loss config and no models
+        # they all land in the same arrival bucket, so do it in one go.
+        if self.loss_data or self.loss_ack or self.models or self.link is not None:
+            for packet in packets:
+                self.send_to_channel(packet, destination_obj)
+            return
+        arrival = self.scheduler.now + self.delay
+        entries = [[packet, arrival, destination_obj, self.delay] for packet in packets]
+        bucket = self.buckets.get(arrival)
+        if bucket is None:
+            bucket = self.buckets[arrival] = deque()
+            self.scheduler.schedule(arrival, self.deliver, arrival, PRIORITY_ARRIVAL)
+        bucket.extend(entries)
+        by_packet = self.by_packet
+        for entry in entries:
+            key = id(entry[0])
+            if key in by_packet:
+                self.shared.setdefault(key, deque()).append(entry)
+            else:
+                by_packet[key] = entry
+
+    def enqueue(self, packet, destination_obj, delay):
+        # put it in the bucket for its arrival tick
+        arrival = self.scheduler.now + delay
+        entry = [packet, arrival, destination_obj, delay]
+        bucket = self.buckets.get(arrival)
+        if bucket is None:
+            bucket = self.buckets[arrival] = deque()
+            self.scheduler.schedule(arrival, self.deliver, arrival, PRIORITY_ARRIVAL)
+        bucket.append(entry)
+        key = id(packet)
+        if key in self.by_packet:
+            self.shared.setdefault(key, deque()).append(entry)
+        else:
+            self.by_packet[key] = entry
+
+    def deliver(self, arrival):
+        # arrival event: hand over everything in this tick's bucket, in send order
+        for entry in self.buckets.pop(arrival):
+            packet = entry[0]
+            if packet is None:
+                continue # killed while flying
+            self.unindex(id(packet), entry)
+            entry[2].receive(packet)
+
+    def unindex(self, key, entry):
+        # drop an entry from by_packet, promoting the next copy of the same packet
+        if self.by_packet[key] is entry:
+            copies = self.shared.get(key)
+            if copies:
+                self.by_packet[key] = copies.popleft()
+                if not copies:
+                    del self.shared[key]
+            else:
+                del self.by_packet[key]
+        else:
+            copies = self.shared[key]
+            copies.remove(entry)
+            if not copies:
+                del self.shared[key]
+
+    def __getstate__(self):
+        # by_packet/shared are keyed by id(), which means nothing after
+        # unpickling. save each packet's copies in order instead, they're the
+        # same entry lists the buckets hold.
+        state = self.__dict__.copy()
+        shared = self.shared
+        state["by_packet"] = [[entry, *shared.get(key, ())] for key, entry in self.by_packet.items()]
+        state["shared"] = None
+        return state
+
+    def __setstate__(self, state):
+        by_packet = {}
+        shared = {}
+        for entry, *rest in state["by_packet"]:
+            key = id(entry[0])
+            by_packet[key] = entry
+            if rest:
+                shared[key] = deque(rest)
+        state["by_packet"] = by_packet
+        state["shared"] = shared
+        self.__dict__.update(state)
+
+    @property
+    def in_transit(self):
+        # the UI still wants [packet, ticks_remaining, destination, total_delay]
+        now = self.scheduler.now
+        return [[pkt, arrival - now, dest, total]
+                for bucket in self.buckets.values()
+                for pkt, arrival, dest, total in bucket
+                if pkt is not None]
 
     def tick(self):
-        # this moves time forward. decrease delay for everything in transit.
-        arrived = []
-        for item in self.in_transit:
-            item[1] -= 1
-            if item[1] <= 0:
-                arrived.append(item)
-        
-        # keep only the stuff that hasn't arrived yet
-        self.in_transit = [x for x in self.in_transit if x[1] > 0]
-        
-        # deliver the arrived packets to their destination (sender or receiver)
-        for packet, _, destination, _ in arrived:
-            destination.receive(packet)
-
-    def kill_specific_packet(self, target_packet):
-        # this helper is used by the UI when i click a packet to delete it manually
-        for i, item in enumerate(self.in_transit):
-            if item[0] == target_packet:
-                self.in_transit.pop(i)
-                return True
-        return False
\ No newline at end of file
+        # compatibility shim for the UI: move time forward one tick and
+        # fire whatever arrivals/timeouts are due.
+        self.scheduler.advance(1)
+
+    def find_entry(self, target_packet, arrival=None):
+        # the transit entry for a packet, or None if it's not in flight.
+        # duplicate ACKs are one object, so without an arrival tick this is
+        # the oldest copy; with one it's the copy landing on that tick.
+        key = id(target_packet)
+        if arrival is None:
+            return self.by_packet.get(key)
+        if key not in self.by_packet:
+            return None
+        for entry in self.buckets.get(arrival, ()):
+            if entry[0] is target_packet:
+                return entry
+        return None
+
+    def kill_specific_packet(self, target_packet, arrival=None):
+        # this helper is used by the UI when i click a packet to delete it manually.
+        # the entry stays in its bucket but is blanked out so deliver() skips it.
+        # pass the arrival tick to pick which copy of a duplicate ACK dies.
+        entry = self.find_entry(target_packet, arrival)
+        if entry is None:
+            return False
+        self.unindex(id(target_packet), entry)
+        entry[0] = None
+        return True
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Pluggable stochastic channel models (random loss, burst
+loss, delay jitter, reordering, duplication and bit errors). A Channel runs every
+packet through its list of models to decide if and when it arrives.
+"""
+
+import random
+
+from wire import NSACK_OFFSET, decode, encode
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, we fall back to the random module
+    np = None
+
+BATCH_SIZE = 4096
+
+
+class RandomStream:
+    # seeded random numbers handed out one at a time but generated in
+    # batches, so the per-packet cost is a list index instead of an RNG call.
+    # note: numpy and the random module give different sequences for the
+    # same seed, runs are only reproducible with the same backend.
+    def __init__(self, seed=None, batch=BATCH_SIZE):
+        self.batch = batch
+        if np is not None:
+            self.rng = np.random.default_rng(seed)
+        else:
+            self.rng = random.Random(seed)
+        self.uniforms = []
+        self.u_pos = 0
+        self.normals = []
+        self.n_pos = 0
+
+    def random(self):
+        # uniform in [0, 1)
+        i = self.u_pos
+        if i >= len(self.uniforms):
+            if np is not None:
+                self.uniforms = self.rng.random(self.batch).tolist()
+            else:
+                r = self.rng.random
+                self.uniforms = [r() for _ in range(self.batch)]
+            i = 0
+        self.u_pos = i + 1
+        return self.uniforms[i]
+
+    def normal(self):
+        # standard normal (mean 0, std 1)
+        i = self.n_pos
+        if i >= len(self.normals):
+            if np is not None:
+                self.normals = self.rng.standard_normal(self.batch).tolist()
+            else:
+                g = self.rng.gauss
+                self.normals = [g(0.0, 1.0) for _ in range(self.batch)]
+            i = 0
+        self.n_pos = i + 1
+        return self.normals[i]
+
+
+class ChannelModel:
+    # base class. apply() gets the packet and a tuple with one delay per copy
+    # that is still going to arrive, and returns the new tuple. an empty tuple
+    # means the packet got dropped. a model that damages packets sets alters
+    # and returns the (possibly different) packet from alter().
+    name = "model"
+    alters = False
+
+    def __init__(self, seed=None, direction="both"):
+        if direction not in ("data", "ack", "both"):
+            raise ValueError(f"direction must be 'data', 'ack' or 'both', not {direction!r}")
+        self.rng = RandomStream(seed)
+        self.direction = direction
+
+    def wants(self, packet):
+        if self.direction == "both":
+            return True
+        return packet.isAck == (self.direction == "ack")
+
+    def apply(self, packet, delays):
+        return delays
+
+    def alter(self, packet):
+        return packet
+
+
+class BernoulliLoss(ChannelModel):
+    # every packet is lost independently with probability p
+    name = "loss"
+
+    def __init__(self, p, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.p = p
+
+    def apply(self, packet, delays):
+        return () if self.rng.random() < self.p else delays
+
+
+class GilbertElliottLoss(ChannelModel):
+    # two state burst loss. the link flips between a GOOD and a BAD state
+    # and each state has its own loss rate, so losses come in clumps.
+    name = "burst loss"
+
+    def __init__(self, p_good_bad, p_bad_good, loss_good=0.0, loss_bad=1.0, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.p_good_bad = p_good_bad
+        self.p_bad_good = p_bad_good
+        self.loss_good = loss_good
+        self.loss_bad = loss_bad
+        self.bad = False
+
+    def apply(self, packet, delays):
+        rng = self.rng
+        # move the state machine one step per packet, then roll for loss
+        if self.bad:
+            if rng.random() < self.p_bad_good:
+                self.bad = False
+        elif rng.random() < self.p_good_bad:
+            self.bad = True
+        loss = self.loss_bad if self.bad else self.loss_good
+        return () if rng.random() < loss else delays
+
+
+class UniformJitter(ChannelModel):
+    # adds a whole number of ticks picked uniformly from [low, high]
+    name = "uniform jitter"
+
+    def __init__(self, low, high, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.low = low
+        self.span = high - low + 1
+
+    def apply(self, packet, delays):
+        rng = self.rng
+        return tuple(max(1, d + self.low + int(rng.random() * self.span)) for d in delays)
+
+
+class NormalJitter(ChannelModel):
+    # adds round(normal(mean, std)) ticks, never going below 1 tick total
+    name = "normal jitter"
+
+    def __init__(self, std, mean=0.0, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.std = std
+        self.mean = mean
+
+    def apply(self, packet, delays):
+        rng = self.rng
+        return tuple(max(1, d + int(round(self.mean + self.std * rng.normal()))) for d in delays)
+
+
+class Reorder(ChannelModel):
+    # with probability p a packet is held back for an extra `gap` ticks,
+    # so packets sent after it can overtake it
+    name = "reorder"
+
+    def __init__(self, p, gap, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.p = p
+        self.gap = gap
+
+    def apply(self, packet, delays):
+        if self.rng.random() < self.p:
+            return tuple(d + self.gap for d in delays)
+        return delays
+
+
+class Duplicate(ChannelModel):
+    # with probability p the channel delivers a second copy, `lag` ticks later
+    name = "duplicate"
+
+    def __init__(self, p, lag=1, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.p = p
+        self.lag = lag
+
+    def apply(self, packet, delays):
+        if delays and self.rng.random() < self.p:
+            return delays + (delays[-1] + self.lag,)
+        return delays
+
+
+class Corrupt(ChannelModel):
+    # with probability p one random bit of the packet's wire image (header or
+    # payload) is flipped. the original object isn't touched, since senders
+    # and receivers reuse packets, the damaged copy is decoded from the bytes.
+    name = "corrupt"
+    alters = True
+
+    def __init__(self, p, seed=None, direction="both"):
+        super().__init__(seed, direction)
+        self.p = p
+        self.corruptCount = 0
+
+    def alter(self, packet):
+        rng = self.rng
+        if rng.random() >= self.p:
+            return packet
+        data = bytearray(encode(packet))
+        # a wrong SACK count can't even be parsed, so leave that byte alone
+        bit = int(rng.random() * (len(data) - 1) * 8)
+        if bit >= NSACK_OFFSET * 8:
+            bit += 8
+        data[bit >> 3] ^= 1 << (bit & 7)
+        self.corruptCount += 1
+        return decode(bytes(data))[0]
+
+
+def build_models(loss=0.0, burst=None, jitter=None, normal_jitter=None,
+                 reorder=None, duplicate=0.0, corrupt=0.0, seed=None, direction="both"):
+    # helper for the command line tools. each model gets its own seed derived
+    # from the main one so adding a model doesn't shift the others' draws.
+    models = []
+    def sub_seed(i):
+        return None if seed is None else seed * 1000 + i
+
+    if loss:
+        models.append(BernoulliLoss(loss, sub_seed(1), direction))
+    if burst:
+        models.append(GilbertElliottLoss(*burst, seed=sub_seed(2), direction=direction))
+    if jitter:
+        models.append(UniformJitter(jitter[0], jitter[1], sub_seed(3), direction))
+    if normal_jitter:
+        models.append(NormalJitter(normal_jitter, seed=sub_seed(4), direction=direction))
+    if reorder:
+        models.append(Reorder(reorder[0], int(reorder[1]), sub_seed(5), direction))
+    if duplicate:
+        models.append(Duplicate(duplicate, seed=sub_seed(6), direction=direction))
+    if corrupt:
+        models.append(Corrupt(corrupt, sub_seed(7), direction))
+    return models
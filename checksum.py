@@ -0,0 +1,140 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Segment checksums. The 16-bit Internet checksum (RFC 1071,
+the one TCP and UDP use) and CRC32C, computed over the packet's wire
+header (with the checksum field zeroed) followed by its payload. The
+Sender and Receiver use these to fill in Packet.checksum and to throw
+away segments that got damaged on the way.
+"""
+
+import sys
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, big buffers just go through the slower path
+    np = None
+
+try:
+    from crc32c import crc32c as _crc32c  # optional: pip install crc32c
+except ImportError:
+    _crc32c = None
+
+from wire import PacketEncoder
+
+HAVE_CRC32C = _crc32c is not None
+NUMPY_MIN = 512     # below this numpy's call overhead costs more than it saves
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def fold(total):
+    # end-around carry: add the high bits back in until it fits in 16 bits
+    while total > 0xFFFF:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+
+def swap16(value):
+    return ((value & 0xFF) << 8) | (value >> 8)
+
+
+def ones_sum(buf):
+    # ones' complement sum of buf as big-endian 16-bit words (an odd last byte
+    # is padded with a zero), folded to 16 bits
+    n = len(buf)
+    if np is None or n < NUMPY_MIN:
+        # the whole buffer as one big integer. 2**16 == 1 (mod 0xFFFF), so
+        # mod 0xFFFF adds up the 16-bit words with the carries wrapped around,
+        # and it runs in C instead of a Python loop over the words.
+        value = int.from_bytes(buf, "big")
+        if n & 1:
+            value <<= 8
+        if not value:
+            return 0
+        return value % 0xFFFF or 0xFFFF
+    # numpy: add it up as native 32-bit words into a 64-bit total. folding that
+    # gives the same 16-bit sum, except that on a little endian machine the two
+    # bytes come out swapped (the sum doesn't care about byte order otherwise).
+    words = n >> 2
+    total = fold(int(np.frombuffer(buf, np.uint32, words).sum(dtype=np.uint64)))
+    if LITTLE_ENDIAN:
+        total = swap16(total)
+    return fold(total + ones_sum(buf[words * 4:]))
+
+
+def internet_checksum(*buffers):
+    # RFC 1071 checksum over the buffers as if they were one. a buffer that
+    # starts at an odd offset has its bytes in the other half of each word.
+    total = 0
+    odd = False
+    for buf in buffers:
+        s = ones_sum(buf)
+        total += swap16(s) if odd else s
+        odd ^= bool(len(buf) & 1)
+    return ~fold(total) & 0xFFFF
+
+
+def _make_crc_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC_TABLE = _make_crc_table()
+
+
+def crc32c(*buffers):
+    # CRC32C (Castagnoli, the one iSCSI and SCTP use). it catches more errors
+    # than the Internet checksum but without the crc32c package this is a
+    # byte at a time Python loop, so only use it there for small runs.
+    crc = 0
+    if _crc32c is not None:
+        for buf in buffers:
+            crc = _crc32c(buf, crc)
+        return crc
+    table = CRC_TABLE
+    crc = 0xFFFFFFFF
+    for buf in buffers:
+        for byte in bytes(buf):
+            crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+ALGORITHMS = {
+    "inet": internet_checksum,
+    "crc32c": crc32c,
+}
+
+
+def get_algorithm(name):
+    # "inet" / "crc32c" -> the function, None or "none" -> no checksums
+    if name is None or name == "none":
+        return None
+    try:
+        return ALGORITHMS[name]
+    except KeyError:
+        raise ValueError(f"unknown checksum {name!r}, pick one of {sorted(ALGORITHMS)}")
+
+
+_encoder = PacketEncoder()
+
+
+def packet_checksum(packet, algorithm):
+    # covers the header as it goes on the wire (checksum field set to 0, no
+    # FIN flag) and the payload
+    header, payload = _encoder.encode(packet, checksum=0)
+    return algorithm(header, payload)
+
+
+def seal(packet, algorithm):
+    packet.checksum = packet_checksum(packet, algorithm)
+    return packet
+
+
+def verify(packet, algorithm):
+    return packet.checksum == packet_checksum(packet, algorithm)
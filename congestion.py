@@ -0,0 +1,159 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Congestion control for the Sender. Reno (slow start,
+congestion avoidance, fast recovery) and CUBIC. The sender asks the
+controller for cwnd and never has more than min(windowSize, cwnd)
+packets in flight.
+"""
+
+INFINITE = float("inf")
+
+
+class Reno:
+    name = "reno"
+
+    def __init__(self, initialCwnd=1, ssthresh=INFINITE, record=True):
+        self.cwnd = float(initialCwnd)
+        self.ssthresh = ssthresh
+        self.initialCwnd = initialCwnd
+        self.inRecovery = False
+        self.srtt = None    # smoothed RTT in ticks, from the sender's samples
+        # the sender sets this to its windowSize. growing cwnd past what the
+        # sender can ever use would just make the next loss reaction meaningless.
+        self.maxCwnd = INFINITE
+        # (tick, cwnd, ssthresh) every time one of them changes
+        self.record = record
+        self.history = []
+
+    def log_state(self, now):
+        if self.record:
+            self.history.append((now, self.cwnd, self.ssthresh))
+
+    def window(self):
+        # whole packets we're allowed to have in flight
+        return max(1, int(self.cwnd))
+
+    def on_rtt(self, rtt):
+        # an RTT sample (ticks) from a segment that was only sent once
+        if self.srtt is None:
+            self.srtt = rtt
+        else:
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def on_ack(self, acked, now):
+        # a new cumulative ACK that covered `acked` more packets
+        if self.inRecovery:
+            # any new ACK ends fast recovery, deflate back to ssthresh
+            self.inRecovery = False
+            self.cwnd = self.ssthresh
+        elif self.cwnd < self.ssthresh:
+            # slow start: +1 per packet acked (doubles every RTT), but don't
+            # jump past ssthresh in one go
+            self.cwnd = min(self.cwnd + acked, max(self.ssthresh, self.cwnd))
+        else:
+            self.avoid_congestion(acked, now)
+        if self.cwnd > self.maxCwnd:
+            self.cwnd = self.maxCwnd
+        self.log_state(now)
+
+    def avoid_congestion(self, acked, now):
+        # congestion avoidance: about +1 per RTT
+        self.cwnd += acked / self.cwnd
+
+    def on_dup_ack(self, count, now):
+        # each extra dup ACK during fast recovery means another packet left
+        # the network, so let one more in
+        if self.inRecovery and count > 3 and self.cwnd < self.maxCwnd:
+            self.cwnd += 1
+            self.log_state(now)
+
+    def on_fast_retransmit(self, flight, now):
+        # 3rd dup ACK: halve and go into fast recovery
+        self.ssthresh = max(flight / 2, 2)
+        self.cwnd = self.ssthresh + 3
+        self.inRecovery = True
+        self.log_state(now)
+
+    def on_timeout(self, flight, now):
+        # a timeout is a much stronger sign, back to slow start
+        self.ssthresh = max(flight / 2, 2)
+        self.cwnd = float(self.initialCwnd)
+        self.inRecovery = False
+        self.log_state(now)
+
+
+class Cubic(Reno):
+    # RFC 8312. after a loss the window grows along a cubic curve centered on
+    # the size it had when the loss happened (wMax): fast at first, flat near
+    # wMax, then probing faster again. time is counted in smoothed RTTs, so
+    # the curve is the RFC's for a 1 s RTT no matter how long a tick is. where
+    # Reno would have grown faster (short RTTs, small windows) it follows
+    # Reno's estimate instead (the TCP-friendly region, section 4.2).
+    name = "cubic"
+
+    def __init__(self, initialCwnd=1, ssthresh=INFINITE, record=True, C=0.4, beta=0.7):
+        super().__init__(initialCwnd, ssthresh, record)
+        self.C = C
+        self.beta = beta
+        self.wMax = 0.0
+        self.K = 0.0
+        self.epochStart = None
+        self.epochCwnd = 0.0    # cwnd when the epoch started, where W_est starts from
+
+    def avoid_congestion(self, acked, now):
+        if self.srtt is None:
+            # no RTT sample yet, so no clock for the curve
+            super().avoid_congestion(acked, now)
+            return
+        if self.epochStart is None:
+            self.epochStart = now
+            self.epochCwnd = self.cwnd
+            if self.cwnd < self.wMax:
+                self.K = ((self.wMax - self.cwnd) / self.C) ** (1 / 3)
+            else:
+                self.K = 0.0
+                self.wMax = self.cwnd
+        t = (now - self.epochStart) / self.srtt
+        # where the curve will be one RTT from now (eq. 1 at t + RTT)
+        target = self.C * (t + 1 - self.K) ** 3 + self.wMax
+        # what Reno would have by now (eq. 4), it grows 3(1-beta)/(1+beta) per RTT
+        west = self.epochCwnd + 3 * (1 - self.beta) / (1 + self.beta) * t
+        if west > target:
+            target = west
+        if target > self.cwnd:
+            self.cwnd += (target - self.cwnd) / self.cwnd * acked
+
+    def reduce(self):
+        self.wMax = self.cwnd
+        self.ssthresh = max(self.cwnd * self.beta, 2)
+        self.epochStart = None
+
+    def on_fast_retransmit(self, flight, now):
+        self.reduce()
+        self.cwnd = self.ssthresh + 3
+        self.inRecovery = True
+        self.log_state(now)
+
+    def on_timeout(self, flight, now):
+        self.reduce()
+        self.cwnd = float(self.initialCwnd)
+        self.inRecovery = False
+        self.log_state(now)
+
+
+CONTROLLERS = {
+    "reno": Reno,
+    "cubic": Cubic,
+}
+
+
+def make_cc(name, **kwargs):
+    # "reno" / "cubic" -> a new controller, None or "none" -> no congestion control
+    if name is None or name == "none":
+        return None
+    try:
+        return CONTROLLERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"unknown congestion control {name!r}, pick one of {sorted(CONTROLLERS)}") from None
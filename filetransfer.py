@@ -0,0 +1,113 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: File transfer mode. The sender memory-maps the input file
+and sends MSS-sized views of it, and the receiver writes in-order data
+straight to the output file at seq * MSS. Neither side holds the whole
+file, so memory stays flat no matter how big it is.
+"""
+
+import math
+import mmap
+import os
+
+from sender import Sender
+
+MSS = 1400               # payload bytes per segment, fits in one ethernet frame
+
+
+def map_file(path):
+    # read-only mapping of the file (an empty file can't be mapped)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class FileSender(Sender):
+    # a Sender whose payloads are MSS-sized chunks of a file. data can be
+    # bytes or an mmap, either way each payload is a memoryview slice of it.
+    def __init__(self, channel, windowSize, timeoutInterval, data, mss=MSS, **kwargs):
+        self.fileData = memoryview(data)
+        self.init_segments(channel, windowSize, timeoutInterval, math.ceil(len(data) / mss), mss, kwargs)
+
+    def init_segments(self, channel, windowSize, timeoutInterval, totalPackets, mss, kwargs):
+        # the part of the constructor that doesn't depend on where the data
+        # comes from, shared with BulkSender
+        self.mss = mss
+        self.onComplete = None   # called once when the last packet is acked
+        kwargs.setdefault("verbose", False)
+        Sender.__init__(self, channel, windowSize, timeoutInterval, totalPackets, **kwargs)
+
+    def payload(self, seq):
+        start = seq * self.mss
+        return self.fileData[start:start + self.mss]
+
+    def receive(self, packet):
+        super().receive(packet)
+        if self.base >= self.totalPackets and self.onComplete is not None:
+            callback, self.onComplete = self.onComplete, None
+            callback()
+
+    def close(self):
+        # let go of the file. views still held by packets in flight keep the
+        # mapping alive, it goes away when the last of them does.
+        data = self.fileData.obj
+        self.fileData.release()
+        if isinstance(data, mmap.mmap):
+            try:
+                data.close()
+            except BufferError:
+                pass
+
+
+class BulkSender(FileSender):
+    # totalPackets segments of mss zero bytes, for when only the size of the
+    # data matters (e.g. over a bandwidth limited link). every payload is a
+    # view of the same mss byte buffer, so it costs nothing per segment.
+    def __init__(self, channel, windowSize, timeoutInterval, totalPackets, mss=MSS, **kwargs):
+        self.fileData = memoryview(bytes(mss))
+        self.init_segments(channel, windowSize, timeoutInterval, totalPackets, mss, kwargs)
+
+    def payload(self, seq):
+        return self.fileData
+
+
+class CountingSink:
+    # receiver sink that just counts bytes, for when nothing reads the data
+    # (bulk flows that only send zeros, the UI's replay session)
+    def __init__(self):
+        self.bytesWritten = 0
+        self.segments = 0
+
+    def write(self, seq, data):
+        self.bytesWritten += len(data)
+        self.segments += 1
+
+
+class FileSink:
+    # where a Receiver puts in-order data in file mode. segment seq goes to
+    # offset seq * mss, so the file comes out right even if the sink is
+    # handed data for a seq it already wrote (it just writes it again).
+    def __init__(self, path, mss=MSS):
+        self.path = path
+        self.mss = mss
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        self.bytesWritten = 0
+        self.segments = 0
+
+    def write(self, seq, data):
+        offset = seq * self.mss
+        if hasattr(os, "pwrite"):
+            n = os.pwrite(self.fd, data, offset)
+        else: # windows has no pwrite
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            n = os.write(self.fd, data)
+        self.bytesWritten += n
+        self.segments += 1
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
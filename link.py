@@ -0,0 +1,238 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Bottleneck link model. Packets wait in a FIFO queue in
+front of a link with a fixed bandwidth and go out one after another,
+each one taking (wire size / bandwidth) ticks to serialize. A queue
+discipline (drop-tail, RED or CoDel) decides which arrivals get dropped
+when the queue builds up, and the link keeps queue occupancy and
+sojourn time statistics.
+"""
+
+import math
+from collections import deque
+
+from channel_models import RandomStream
+from wire import wire_size
+
+DEFAULT_LIMIT = 100     # queue size in packets
+
+
+class DropTail:
+    # drop whatever arrives while the queue is full
+    name = "droptail"
+
+    def __init__(self, limit=DEFAULT_LIMIT, seed=None):
+        self.limit = limit
+
+    def drop(self, qlen, now, sojourn):
+        # qlen: packets already queued, sojourn: how long this one would wait
+        return qlen >= self.limit
+
+    def idle(self, ticks, service):
+        # the link sat empty for `ticks` before this arrival, see RED.idle
+        pass
+
+
+class RED:
+    # random early detection (Floyd & Jacobson). keeps a moving average of
+    # the queue length and once it passes minTh drops arrivals at random,
+    # more often the closer it gets to maxTh, and all of them above that.
+    # the flows see a loss before the queue is full, so they back off at
+    # different times instead of all at once.
+    name = "red"
+
+    def __init__(self, limit=DEFAULT_LIMIT, seed=None, minTh=None, maxTh=None, maxP=0.1, weight=0.002):
+        self.limit = limit
+        self.minTh = minTh if minTh is not None else max(1, limit // 4)
+        self.maxTh = maxTh if maxTh is not None else max(self.minTh + 1, 3 * limit // 4)
+        self.maxP = maxP
+        self.weight = weight
+        self.rng = RandomStream(seed)
+        self.avg = 0.0
+        self.count = -1     # arrivals since the last drop, -1 while avg is under minTh
+
+    def idle(self, ticks, service):
+        # the average only moves when packets arrive, so after an idle period
+        # it would still say the queue is as long as before. decay it as if
+        # m small packets had arrived to an empty queue meanwhile:
+        # avg *= (1 - w)^m, m = idle time / time to send one packet
+        if service > 0:
+            self.avg *= (1 - self.weight) ** (ticks / service)
+
+    def drop(self, qlen, now, sojourn):
+        self.avg += self.weight * (qlen - self.avg)
+        if qlen >= self.limit:
+            self.count = 0
+            return True
+        avg = self.avg
+        if avg < self.minTh:
+            self.count = -1
+            return False
+        if avg >= self.maxTh:
+            self.count = 0
+            return True
+        # spread the drops out: the longer since the last one, the likelier
+        self.count += 1
+        pb = self.maxP * (avg - self.minTh) / (self.maxTh - self.minTh)
+        pa = pb / (1 - self.count * pb) if self.count * pb < 1 else 1.0
+        if self.rng.random() < pa:
+            self.count = 0
+            return True
+        return False
+
+
+class CoDel:
+    # controlled delay (Nichols & Jacobson, RFC 8289). it looks at how long
+    # packets wait instead of how many are waiting: once the sojourn time has
+    # stayed above target for a whole interval it drops one, then drops
+    # more and more often (interval / sqrt(count)) until the delay is back
+    # under target. a big queue that drains quickly is left alone.
+    # the RFC decides at dequeue time. our FIFO knows when each packet will
+    # reach the head as soon as it arrives, so the decision is made then,
+    # with the clock set to that dequeue time.
+    name = "codel"
+
+    def __init__(self, limit=DEFAULT_LIMIT, seed=None, target=5, interval=100):
+        self.limit = limit          # still a bounded queue, full means drop
+        self.target = target        # acceptable standing delay in ticks
+        self.interval = interval    # about one RTT in ticks
+        self.firstAbove = None      # when a delay above target becomes a problem
+        self.dropping = False
+        self.dropNext = 0.0
+        self.count = 0              # drops in the current dropping state
+        self.lastCount = 0
+
+    def idle(self, ticks, service):
+        pass    # an empty queue already resets firstAbove in drop()
+
+    def control_law(self, t):
+        return t + self.interval / math.sqrt(self.count)
+
+    def drop(self, qlen, now, sojourn):
+        if qlen >= self.limit:
+            return True
+        t = now + sojourn   # when it would be dequeued
+        ok_to_drop = False
+        if sojourn < self.target or qlen == 0:
+            self.firstAbove = None
+        elif self.firstAbove is None:
+            self.firstAbove = t + self.interval
+        elif t >= self.firstAbove:
+            ok_to_drop = True
+
+        if self.dropping:
+            if not ok_to_drop:
+                self.dropping = False
+            elif t >= self.dropNext:
+                self.count += 1
+                self.dropNext = self.control_law(self.dropNext)
+                return True
+            return False
+        if ok_to_drop:
+            # start dropping. if we were dropping not long ago, pick up near
+            # the rate we left off at instead of starting over
+            self.dropping = True
+            delta = self.count - self.lastCount
+            if delta > 1 and t - self.dropNext < 16 * self.interval:
+                self.count = delta
+            else:
+                self.count = 1
+            self.lastCount = self.count
+            self.dropNext = self.control_law(t)
+            return True
+        return False
+
+
+QUEUES = {
+    "droptail": DropTail,
+    "red": RED,
+    "codel": CoDel,
+}
+
+
+def make_queue(name, limit=DEFAULT_LIMIT, seed=None, **options):
+    # "droptail" / "red" / "codel" -> a new queue discipline. options go to
+    # its constructor (e.g. target/interval for CoDel)
+    try:
+        return QUEUES[name](limit, seed, **options)
+    except KeyError:
+        raise ValueError(f"unknown queue {name!r}, pick one of {sorted(QUEUES)}")
+
+
+class Link:
+    # a FIFO with a fixed service rate, so a packet's departure time is known
+    # the moment it's queued. that means no event per packet: the channel
+    # just puts it in the arrival bucket for departure + propagation delay.
+    def __init__(self, bandwidth, queue=None, size=wire_size):
+        if bandwidth <= 0:
+            raise ValueError("bandwidth must be positive")
+        self.bandwidth = bandwidth  # bytes per tick
+        self.queue = queue if queue is not None else DropTail()
+        self.size = size            # packet -> bytes on the wire
+        self.departures = deque()   # when each queued packet finishes sending, oldest first
+        self.busyUntil = 0.0        # when the link finishes everything queued so far
+        self.lastService = 0.0      # serialization time of the latest packet
+        self.sentCount = 0
+        self.bytesSent = 0
+        self.dropCount = 0
+        # queue statistics, see stats()
+        self.maxBacklog = 0         # most packets queued at once
+        self.sojournTotal = 0.0     # ticks spent waiting before serialization
+        self.sojournMax = 0.0
+        self.residenceTotal = 0.0   # ticks from arrival until fully sent
+        self.busyTime = 0.0         # ticks spent serializing
+
+    def backlog(self, now):
+        # packets queued or being sent at time now
+        departures = self.departures
+        while departures and departures[0] <= now:
+            departures.popleft()
+        return len(departures)
+
+    def admit(self, packet, now):
+        # returns when the packet has completely left the link, or None if the
+        # queue discipline dropped it
+        qlen = self.backlog(now)
+        if qlen == 0 and self.busyUntil < now:
+            self.queue.idle(now - self.busyUntil, self.lastService)
+        start = self.busyUntil if self.busyUntil > now else now
+        sojourn = start - now
+        if self.queue.drop(qlen, now, sojourn):
+            self.dropCount += 1
+            return None
+        size = self.size(packet)
+        service = size / self.bandwidth
+        self.lastService = service
+        self.busyUntil = start + service
+        self.departures.append(self.busyUntil)
+        self.sentCount += 1
+        self.bytesSent += size
+        if qlen >= self.maxBacklog:
+            self.maxBacklog = qlen + 1
+        self.sojournTotal += sojourn
+        if sojourn > self.sojournMax:
+            self.sojournMax = sojourn
+        self.residenceTotal += sojourn + service
+        self.busyTime += service
+        return self.busyUntil
+
+    def bdp(self, rtt, size):
+        # bandwidth-delay product in packets of `size` bytes: how many have
+        # to be in flight to keep the link busy for a round trip of rtt ticks
+        return self.bandwidth * rtt / size
+
+    def stats(self, elapsed):
+        # queue metrics over a run of `elapsed` ticks. the time-averaged
+        # occupancy is the total time packets spent in the queue (waiting or
+        # being sent) divided by the run time, Little's law.
+        n = self.sentCount
+        return {
+            "queue_drops": self.dropCount,
+            "avg_queue": self.residenceTotal / elapsed if elapsed else 0.0,
+            "max_queue": self.maxBacklog,
+            "avg_sojourn": self.sojournTotal / n if n else 0.0,
+            "max_sojourn": self.sojournMax,
+            "link_utilization": min(1.0, self.busyTime / elapsed) if elapsed else 0.0,
+        }
@@ -0,0 +1,339 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Many connections sharing one bottleneck. A MuxChannel
+carries the segments of every Sender/Receiver pair, tagged with their
+connection id, and pushes the data through a single Link (finite
+bandwidth, drop-tail, RED or CoDel queue). MultiFlowSimulation runs N bulk
+flows over it and reports per-flow goodput, the aggregate, and Jain's
+fairness index.
+"""
+
+import argparse
+import csv
+import time
+from collections import deque
+
+from channel import Channel
+from channel_models import RandomStream
+from checksum import get_algorithm
+from congestion import make_cc
+from filetransfer import MSS, BulkSender, CountingSink
+from link import DEFAULT_LIMIT, Link, make_queue
+from receiver import Receiver
+from scheduler import EventScheduler, PRIORITY_ARRIVAL, PRIORITY_SEND
+from simulation import add_link_args, add_model_args, add_trace_args, link_from_args, models_from_args, save_trace
+from tracer import CHANNEL, DROP, Tracer
+
+
+def jain_index(values):
+    # (sum x)^2 / (n * sum x^2): 1.0 when everyone gets the same, 1/n when one
+    # flow gets everything
+    values = list(values)
+    squares = sum(x * x for x in values)
+    if not squares:
+        return 0.0
+    return sum(values) ** 2 / (len(values) * squares)
+
+
+class Port:
+    # one connection's view of the MuxChannel. it looks like a Channel to the
+    # Sender and Receiver, and tags what they send with the connection id.
+    def __init__(self, mux, connId):
+        self.mux = mux
+        self.connId = connId
+        self.scheduler = mux.scheduler
+        self.dropCount = 0   # this connection's packets lost to models or the link
+
+    def send_to_channel(self, packet, destination_obj):
+        # the destination comes from the connection table, not the caller
+        self.mux.send(self.connId, packet)
+
+    def send_batch(self, packets, destination_obj):
+        send = self.mux.send
+        connId = self.connId
+        for packet in packets:
+            send(connId, packet)
+
+
+class MuxChannel:
+    # one shared channel for many connections. data segments go through the
+    # bottleneck link (if there is one), ACKs come back on an uncongested
+    # reverse path. arrivals from every connection share the per-tick
+    # buckets, so a busy tick is still one scheduler event.
+    def __init__(self, delay, link=None, models=None, scheduler=None, tracer=None):
+        self.scheduler = scheduler if scheduler is not None else EventScheduler()
+        self.delay = delay
+        self.link = link
+        self.models = list(models) if models else []
+        self.flows = []      # connId -> (sender, receiver)
+        self.ports = []      # connId -> Port
+        # arrival tick -> deque of (connId, packet)
+        self.buckets = {}
+        self.dropCount = 0
+        self.trace = tracer
+
+    def open(self):
+        # a new connection: returns its Port, call attach() once the
+        # Sender and Receiver exist
+        port = Port(self, len(self.ports))
+        self.ports.append(port)
+        self.flows.append(None)
+        return port
+
+    def attach(self, port, sender, receiver):
+        self.flows[port.connId] = (sender, receiver)
+        sender.set_receiver_ref(receiver)
+        receiver.set_sender_ref(sender)
+
+    def send(self, connId, packet):
+        now = self.scheduler.now
+        packet, delays, dropped = Channel.route(packet, self.delay, self.models, self.link, now)
+        if dropped is not None:
+            self.drop(connId, packet, dropped[0])
+            return
+        entry = (connId, packet)
+        for d in delays:
+            arrival = now + d
+            bucket = self.buckets.get(arrival)
+            if bucket is None:
+                bucket = self.buckets[arrival] = deque()
+                self.scheduler.schedule(arrival, self.deliver, arrival, PRIORITY_ARRIVAL)
+            bucket.append(entry)
+
+    def drop(self, connId, packet, reason):
+        self.dropCount += 1
+        self.ports[connId].dropCount += 1
+        if self.trace is not None:
+            seq, ack = (-1, packet.ackNum) if packet.isAck else (packet.seqNum, -1)
+            self.trace.record(self.scheduler.now, DROP, CHANNEL, seq, ack, reason, connId)
+
+    def deliver(self, arrival):
+        flows = self.flows
+        for connId, packet in self.buckets.pop(arrival):
+            sender, receiver = flows[connId]
+            if packet.isAck:
+                sender.receive(packet)
+            else:
+                receiver.receive(packet)
+
+
+class FlowResult:
+    def __init__(self, connId, packets, bytes_delivered, start, end, completed,
+                 retransmits, timeouts, dropped):
+        self.connId = connId
+        self.packets = packets              # packets delivered in order
+        self.bytes = bytes_delivered
+        self.start = start                  # tick the flow started sending
+        self.end = end                      # tick of its last ACK (or when the run stopped)
+        self.completed = completed
+        self.retransmits = retransmits
+        self.timeouts = timeouts
+        self.dropped = dropped
+
+    @property
+    def goodput(self):
+        # packets per tick over the flow's own lifetime
+        ticks = self.end - self.start
+        return self.packets / ticks if ticks > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "conn": self.connId,
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "start": self.start,
+            "end": self.end,
+            "goodput": self.goodput,
+            "retransmits": self.retransmits,
+            "timeouts": self.timeouts,
+            "dropped": self.dropped,
+            "completed": self.completed,
+        }
+
+
+class MultiFlowResult:
+    def __init__(self, flows, ticks, bandwidth, queue_stats, wall_time):
+        self.flows = flows              # list of FlowResult
+        self.ticks = ticks              # until the last flow finished
+        self.bandwidth = bandwidth      # bytes per tick, None = unlimited
+        self.queue_stats = queue_stats  # Link.stats() of the bottleneck, {} without one
+        self.wall_time = wall_time
+
+    @property
+    def packets(self):
+        return sum(f.packets for f in self.flows)
+
+    @property
+    def goodput(self):
+        # all flows together, packets per tick
+        return self.packets / self.ticks if self.ticks else 0.0
+
+    @property
+    def fairness(self):
+        return jain_index(f.goodput for f in self.flows)
+
+    @property
+    def utilization(self):
+        # share of the bottleneck's capacity that carried useful bytes
+        if not self.bandwidth or not self.ticks:
+            return None
+        return sum(f.bytes for f in self.flows) / (self.bandwidth * self.ticks)
+
+    @property
+    def completed(self):
+        return all(f.completed for f in self.flows)
+
+    def as_dict(self):
+        goodputs = sorted(f.goodput for f in self.flows)
+        return {
+            "flows": len(self.flows),
+            "ticks": self.ticks,
+            "packets": self.packets,
+            "goodput": self.goodput,
+            "flow_goodput_min": goodputs[0] if goodputs else 0.0,
+            "flow_goodput_median": goodputs[len(goodputs) // 2] if goodputs else 0.0,
+            "flow_goodput_max": goodputs[-1] if goodputs else 0.0,
+            "jain_index": self.fairness,
+            "utilization": self.utilization,
+            "retransmits": sum(f.retransmits for f in self.flows),
+            **self.queue_stats,
+            "wall_time": self.wall_time,
+            "completed": self.completed,
+        }
+
+
+class MultiFlowSimulation:
+    # N identical bulk transfers over one bottleneck (a dumbbell). each flow
+    # is a BulkSender, so the payloads have a real size for the link to
+    # serialize without holding any data per flow.
+    def __init__(self, flows, windowSize, timeoutInterval, totalPackets, delay,
+                 bandwidth=None, queue="droptail", queue_limit=DEFAULT_LIMIT, queue_options=None, mss=MSS,
+                 models=None, sack=False, adaptive_rto=False, cc=None, checksum=None,
+                 rwnd=None, delayed_ack=None, start_spread=0, seed=None, max_ticks=None, tracer=None):
+        link = None
+        if bandwidth:
+            link = Link(bandwidth, make_queue(queue, queue_limit, seed, **(queue_options or {})))
+        self.mux = MuxChannel(delay, link, models, tracer=tracer)
+        self.bandwidth = bandwidth
+        self.max_ticks = max_ticks
+        self.remaining = flows
+        self.senders = []
+        self.receivers = []
+        self.startTimes = [None] * flows
+        self.finishTimes = [None] * flows
+
+        checksum = get_algorithm(checksum)
+        rng = RandomStream(seed)
+        sched = self.mux.scheduler
+        for connId in range(flows):
+            port = self.mux.open()
+            trace = tracer.for_conn(connId) if tracer is not None else None
+            sender = BulkSender(port, windowSize, timeoutInterval, totalPackets, mss, sack=sack,
+                                adaptiveRto=adaptive_rto, cc=make_cc(cc), checksum=checksum, tracer=trace)
+            receiver = Receiver(port, verbose=False, sack=sack, checksum=checksum, sink=CountingSink(),
+                                capacity=rwnd or windowSize, ackDelay=delayed_ack, tracer=trace)
+            sender.onComplete = lambda connId=connId: self.on_flow_done(connId)
+            self.mux.attach(port, sender, receiver)
+            self.senders.append(sender)
+            self.receivers.append(receiver)
+            # staggered starts so the flows don't all slow start in lockstep
+            start = int(rng.random() * start_spread) if start_spread else 0
+            sched.schedule(start, self.start_flow, connId, PRIORITY_SEND)
+
+    @property
+    def ticks(self):
+        return self.mux.scheduler.now
+
+    def start_flow(self, connId):
+        self.startTimes[connId] = self.mux.scheduler.now
+        self.senders[connId].set_auto_send(True)
+
+    def on_flow_done(self, connId):
+        self.finishTimes[connId] = self.mux.scheduler.now
+        self.remaining -= 1
+
+    def run(self):
+        start = time.perf_counter()
+        sched = self.mux.scheduler
+        while self.remaining:
+            t = sched.next_time()
+            if t is None:
+                break
+            if self.max_ticks is not None and t > self.max_ticks:
+                sched.run_until(self.max_ticks)
+                break
+            sched.run_next()
+        return self.result(time.perf_counter() - start)
+
+    def result(self, wall_time=0.0):
+        now = self.ticks
+        flows = []
+        for connId, (sender, receiver) in enumerate(self.mux.flows):
+            started = self.startTimes[connId]
+            finished = self.finishTimes[connId]
+            flows.append(FlowResult(
+                connId,
+                packets=receiver.expectedSeqNum,
+                bytes_delivered=receiver.sink.bytesWritten,
+                start=started if started is not None else now,
+                end=finished if finished is not None else now,
+                completed=finished is not None,
+                retransmits=sender.retransmitCount,
+                timeouts=sender.timeoutCount,
+                dropped=self.mux.ports[connId].dropCount,
+            ))
+        link = self.mux.link
+        ticks = max(f.end for f in flows) if flows else now
+        return MultiFlowResult(flows, ticks, self.bandwidth, link.stats(ticks) if link else {}, wall_time)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many connections over one bottleneck link.")
+    parser.add_argument("--flows", type=int, default=50)
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--timeout", type=int, default=300)
+    parser.add_argument("--packets", type=int, default=200, help="packets per flow")
+    parser.add_argument("--delay", type=int, default=30)
+    parser.add_argument("--mss", type=int, default=MSS, help="payload bytes per segment")
+    parser.add_argument("--start-spread", type=int, default=0,
+                        help="start each flow at a random tick in [0, N)")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--sack", action="store_true")
+    parser.add_argument("--cc", choices=["none", "reno", "cubic"], default="none")
+    parser.add_argument("--adaptive-rto", action="store_true")
+    parser.add_argument("--checksum", choices=["none", "inet", "crc32c"], default="none")
+    parser.add_argument("--rwnd", type=int, default=None)
+    parser.add_argument("--delayed-ack", type=int, default=None, metavar="TICKS")
+    parser.add_argument("--per-flow", default=None, help="write every flow's results to this CSV")
+    add_link_args(parser)
+    add_model_args(parser)
+    add_trace_args(parser)
+    args = parser.parse_args(argv)
+    if args.flows < 1:
+        parser.error("--flows must be at least 1")
+    tracer = Tracer(args.trace_capacity) if args.trace else None
+
+    sim = MultiFlowSimulation(args.flows, args.window, args.timeout, args.packets, args.delay,
+                              mss=args.mss, models=models_from_args(args), sack=args.sack,
+                              adaptive_rto=args.adaptive_rto, cc=args.cc, checksum=args.checksum,
+                              rwnd=args.rwnd, delayed_ack=args.delayed_ack,
+                              start_spread=args.start_spread, seed=args.seed, max_ticks=args.max_ticks,
+                              tracer=tracer, **link_from_args(args))
+    res = sim.run()
+    if tracer is not None:
+        save_trace(tracer, args.trace)
+    if args.per_flow:
+        with open(args.per_flow, "w", newline="") as f:
+            rows = [flow.as_dict() for flow in res.flows]
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    for key, value in res.as_dict().items():
+        print(f"{key:>20}: {value}")
+    return res
+
+
+if __name__ == "__main__":
+    main()
@@ -7,15 +7,22 @@ Description: Packet Class: creates a packet/segment that will be sent
 
 
 class Packet:
-    def __init__(self, seqNum, isAck=False, ackNum=-1, data=None, checksum=0):
+    # no per-instance __dict__, big runs create millions of these
+    __slots__ = ("seqNum", "isAck", "ackNum", "data", "checksum", "sackBlocks", "rwnd")
+
+    def __init__(self, seqNum, isAck=False, ackNum=-1, data=None, checksum=0, sackBlocks=None, rwnd=None):
         self.seqNum = seqNum    # seq number
         self.isAck = isAck        # True if ACK, False if Data
         self.ackNum = ackNum      # ACK number (used for cumul. ACKs)
         self.data = data       
         self.checksum = checksum 
+        self.sackBlocks = sackBlocks # SACK mode: ((start, end), ...) ranges the receiver has buffered
+        self.rwnd = rwnd          # ACKs: free room in the receiver's buffer, in segments
 
     def __repr__(self):
         if self.isAck:
+            if self.sackBlocks:
+                return f"[ACK: {self.ackNum} SACK {list(self.sackBlocks)}]"
             return f"[ACK: {self.ackNum}]"
         else:
             return f"[DATA: {self.seqNum}]"
\ No newline at end of file
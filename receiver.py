@@ -6,57 +6,303 @@ Description: Receiver logic that handles accepting data in order,
 buffering out-of-order packets, and sending cumulative ACKs.
 """
 
+from checksum import seal, verify
 from packet import Packet
+from scheduler import PRIORITY_TIMER
+from tracer import ACK_SENT, BUFFER, DELIVER, DROP, DROP_CHECKSUM, DROP_OVERFLOW, RECEIVER
+
+DEFAULT_CAPACITY = 64   # receive buffer size in segments
+
+
+class ReorderRing:
+    # fixed size receive buffer. seq goes in slot seq % capacity, which is
+    # unique as long as everything stored is within capacity of the oldest
+    # seq still held. `present` has a 1 byte flag per slot so runs and gaps
+    # can be found with bytearray.find() instead of a loop in Python.
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.present = bytearray(capacity)
+        self.count = 0
+
+    def __contains__(self, seq):
+        pkt = self.slots[seq % self.capacity]
+        return pkt is not None and pkt.seqNum == seq
+
+    def __setitem__(self, seq, packet):
+        i = seq % self.capacity
+        if not self.present[i]:
+            self.present[i] = 1
+            self.count += 1
+        self.slots[i] = packet
+
+    def pop(self, seq):
+        i = seq % self.capacity
+        pkt = self.slots[i]
+        self.slots[i] = None
+        self.present[i] = 0
+        self.count -= 1
+        return pkt
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # buffered seq numbers, lowest first
+        return iter(sorted(pkt.seqNum for pkt in self.slots if pkt is not None))
+
+    def run_length(self, seq, limit):
+        # how many slots in a row are filled starting at seq (at most limit)
+        cap = self.capacity
+        i = seq % cap
+        end = i + limit
+        if end <= cap:
+            j = self.present.find(0, i, end)
+            return limit if j < 0 else j - i
+        j = self.present.find(0, i)
+        if j >= 0:
+            return j - i
+        j = self.present.find(0, 0, end - cap)
+        return limit if j < 0 else cap - i + j
+
+    def take_run(self, seq, n):
+        # remove and return the n packets starting at seq, in order
+        cap = self.capacity
+        i = seq % cap
+        if i + n <= cap:
+            pkts = self.slots[i:i + n]
+            self.slots[i:i + n] = [None] * n
+            self.present[i:i + n] = bytes(n)
+        else:
+            k = cap - i
+            pkts = self.slots[i:] + self.slots[:n - k]
+            self.slots[i:] = [None] * k
+            self.slots[:n - k] = [None] * (n - k)
+            self.present[i:] = bytes(k)
+            self.present[:n - k] = bytes(n - k)
+        self.count -= n
+        return pkts
+
+    def blocks(self, seq, limit):
+        # (start, end) ranges of filled slots among the limit seqs from seq
+        i = seq % self.capacity
+        flags = self.present[i:i + limit]
+        if len(flags) < limit:
+            flags += self.present[:limit - len(flags)]
+        out = []
+        pos = flags.find(1)
+        while pos >= 0:
+            end = flags.find(0, pos)
+            if end < 0:
+                end = limit
+            out.append((seq + pos, seq + end))
+            pos = flags.find(1, end)
+        return tuple(out)
+
 
 class Receiver:
-    def __init__(self, channel, log_callback=None):
+    def __init__(self, channel, log_callback=None, verbose=True, sack=False, checksum=None,
+                 sink=None, capacity=DEFAULT_CAPACITY, readRate=None, ackDelay=None, ackEvery=2, tracer=None):
         self.channel = channel
         self.expectedSeqNum = 0
+        # in-order data goes to the sink (e.g. a FileSink) if there is one,
+        # otherwise it's collected here
+        self.sink = sink
         self.received_data = [] 
-        # using a dictionary for the buffer to easily packets by their seq number
-        self.buffer = {} 
+        # the receive buffer: a ring of `capacity` segments holding out-of-order
+        # packets, plus in-order ones the application hasn't read yet
+        self.capacity = capacity
+        self.buffer = ReorderRing(capacity)
+        self.overflowCount = 0  # packets that arrived with no room for them
+        # flow control: the app reads readRate segments per tick (None means it
+        # reads everything right away). readSeq is the next one it will read,
+        # and the window we advertise is what's left of the buffer after that.
+        self.readRate = readRate
+        self.readSeq = 0
+        self.readCredit = 0.0
+        self.readEvent = None
+        self.lastAdvertised = capacity
+        self.windowUpdates = 0  # ACKs sent only because the window opened up
         self.sender_ref = None
         self.log = log_callback # used to update the UI log
+        self.verbose = verbose  # turn off terminal prints for headless runs
+        self.trace = tracer     # structured event tracer (tracer.py) or None
+        self.duplicateCount = 0 # old packets we got again (already delivered)
+        self.lastAck = None     # last ACK packet we sent, reused for duplicate ACKs
+        self.ackCount = 0       # ACKs actually sent
+        # delayed ACKs: with an ackDelay (ticks), in-order segments are ACKed
+        # every ackEvery segments or when the ACK timer runs out, whichever
+        # comes first. anything out of order is still ACKed right away.
+        self.ackDelay = ackDelay
+        self.ackEvery = ackEvery
+        self.pendingAcks = 0    # in-order segments we owe an ACK for
+        self.ackEvent = None
+        self.sack = sack        # SACK mode: ACKs also list the ranges sitting in the buffer
+        self.checksum = checksum # checksum function (checksum.py) or None
+        self.corruptCount = 0   # segments dropped because the checksum was wrong
 
     def set_sender_ref(self, sender):
         self.sender_ref = sender
 
+    def deliver(self, seq, data):
+        # hand in-order data to the application
+        if self.sink is not None:
+            self.sink.write(seq, data)
+        else:
+            self.received_data.append(data)
+
+    def window(self):
+        # free room in the buffer past the next expected seq (rwnd, in segments)
+        return self.readSeq + self.capacity - self.expectedSeqNum
+
+    def sack_blocks(self):
+        # the buffered seq numbers past expectedSeqNum as (start, end) ranges,
+        # end not included. e.g. buffer {5, 6, 7, 9} -> ((5, 8), (9, 10))
+        return self.buffer.blocks(self.expectedSeqNum, self.window())
+
+    def out_of_order(self):
+        # is anything buffered past a gap? (the rest of the buffer is in-order
+        # data the app hasn't read yet)
+        return self.buffer.count > self.expectedSeqNum - self.readSeq
+
     def receive(self, packet):
+        # a damaged segment gets no ACK at all, the sender will time out or
+        # see dup ACKs from the segments after it, same as a loss
+        if self.checksum is not None and not verify(packet, self.checksum):
+            self.corruptCount += 1
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, DROP, RECEIVER, packet.seqNum, value=DROP_CHECKSUM)
+            if self.log: self.log("[Recv] Bad checksum, dropped", (255, 0, 0))
+            if self.verbose: print(f" [Receiver] Bad checksum on {packet.seqNum}, dropped")
+            return
+
         # receivers don't care about ACKs, so just ignore them
         if packet.isAck: return 
 
+        # delayed ACK mode only holds back ACKs for plain in-order arrivals
+        immediate = True
+
+        # no room for it (or it's a zero window probe), the sender will have
+        # to send it again. the ACK below tells it how much room there is.
+        if packet.seqNum >= self.readSeq + self.capacity:
+            self.overflowCount += 1
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, DROP, RECEIVER, packet.seqNum, value=DROP_OVERFLOW)
+            if self.log: self.log(f"[Recv] No room for {packet.seqNum}", (255, 0, 0))
+
         # Case 1: we got exactly what we were expecting
-        if packet.seqNum == self.expectedSeqNum:
+        elif packet.seqNum == self.expectedSeqNum:
             if self.log: self.log(f"[Recv] Accepted {packet.seqNum}", (0, 0, 255))
-            print(f" [Receiver] Accepted Packet {packet.seqNum}")
-            
-            self.received_data.append(packet.data)
+            if self.verbose: print(f" [Receiver] Accepted Packet {packet.seqNum}")
+
+            if self.readRate is None:
+                self.deliver(packet.seqNum, packet.data)
+            else:
+                self.buffer[packet.seqNum] = packet # waits here until the app reads it
             self.expectedSeqNum += 1
-            
+
             # check the buffer to see if we already have the next few packets.
             # if we do, we can deliver them to the app layer right now.
-            while self.expectedSeqNum in self.buffer:
-                if self.log: self.log(f"[Recv] Unbuffered {self.expectedSeqNum}", (0, 0, 255))
-                self.received_data.append(self.buffer.pop(self.expectedSeqNum).data)
-                self.expectedSeqNum += 1
+            n = self.buffer.run_length(self.expectedSeqNum, self.window()) if self.buffer.count else 0
+            if n:
+                if self.log: self.log(f"[Recv] Unbuffered {self.expectedSeqNum}-{self.expectedSeqNum + n - 1}", (0, 0, 255))
+                if self.readRate is None:
+                    for pkt in self.buffer.take_run(self.expectedSeqNum, n):
+                        self.deliver(pkt.seqNum, pkt.data)
+                self.expectedSeqNum += n
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, DELIVER, RECEIVER, packet.seqNum, value=n + 1)
+            # filling a gap (or arriving with one still open) gets an ACK right
+            # away, the sender is waiting to hear about it
+            immediate = bool(n) or self.out_of_order()
+            if self.readRate is None:
+                self.readSeq = self.expectedSeqNum
+            elif self.readEvent is None:
+                sched = self.channel.scheduler
+                self.readEvent = sched.schedule(sched.now + 1, self.on_read_event, priority=PRIORITY_TIMER)
 
         # Case 2: we got a packet from the future (out of order)
         elif packet.seqNum > self.expectedSeqNum:
             # only buffer it if we haven't seen it before
             if packet.seqNum not in self.buffer:
                 if self.log: self.log(f"[Recv] Buffered {packet.seqNum} (Gap!)", (255, 165, 0))
-                print(f" [Receiver] Buffered Packet {packet.seqNum}")
+                if self.verbose: print(f" [Receiver] Buffered Packet {packet.seqNum}")
                 self.buffer[packet.seqNum] = packet
-            
+                if self.trace is not None:
+                    self.trace.record(self.channel.scheduler.now, BUFFER, RECEIVER, packet.seqNum,
+                                      value=self.buffer.count)
+
         # Case 3: it's an old packet we already processed
         else:
+            self.duplicateCount += 1
             if self.log: self.log(f"[Recv] Ignored Dup {packet.seqNum}")
 
         # critical tcp feature: always send an ACK for the *next* packet we need.
         # this is how the sender knows if we have a gap or if we are up to date.
-        ack_packet = Packet(seqNum=-1, isAck=True, ackNum=self.expectedSeqNum)
-        
+        if immediate or self.ackDelay is None:
+            self.send_ack()
+            return
+        self.pendingAcks += 1
+        if self.pendingAcks >= self.ackEvery:
+            self.send_ack()
+        elif self.ackEvent is None:
+            sched = self.channel.scheduler
+            self.ackEvent = sched.schedule(sched.now + self.ackDelay, self.on_ack_timer, priority=PRIORITY_TIMER)
+
+    def on_ack_timer(self, _):
+        self.ackEvent = None
+        if self.pendingAcks:
+            if self.log: self.log("[Recv] Delayed ACK timer", (200, 180, 0))
+            self.send_ack()
+
+    def send_ack(self):
+        # one ACK covers everything we owed one for
+        self.pendingAcks = 0
+        if self.ackEvent is not None:
+            self.channel.scheduler.cancel(self.ackEvent)
+            self.ackEvent = None
+        self.ackCount += 1
+
+        # ACKs are never modified after they're sent, so a duplicate ACK can
+        # just reuse the same object instead of allocating a new one.
+        blocks = self.sack_blocks() if (self.sack and self.buffer.count) else None
+        rwnd = self.window()
+        ack_packet = self.lastAck
+        if ack_packet is None or ack_packet.ackNum != self.expectedSeqNum or ack_packet.sackBlocks != blocks \
+                or ack_packet.rwnd != rwnd:
+            ack_packet = self.lastAck = Packet(seqNum=-1, isAck=True, ackNum=self.expectedSeqNum,
+                                               sackBlocks=blocks, rwnd=rwnd)
+            if self.checksum is not None:
+                seal(ack_packet, self.checksum)
+        self.lastAdvertised = rwnd
+        if self.trace is not None:
+            self.trace.record(self.channel.scheduler.now, ACK_SENT, RECEIVER, ack=self.expectedSeqNum, value=rwnd)
+
         if self.log: self.log(f"[Recv] Sent ACK {self.expectedSeqNum}", (200, 180, 0))
-        print(f" [Receiver] Sending ACK {self.expectedSeqNum}")
-        
-        self.channel.send_to_channel(ack_packet, self.sender_ref)
\ No newline at end of file
+        if self.verbose: print(f" [Receiver] Sending ACK {self.expectedSeqNum}")
+
+        self.channel.send_to_channel(ack_packet, self.sender_ref)
+
+    def on_read_event(self, _):
+        # the application reads as much as its rate allows this tick
+        self.readEvent = None
+        self.readCredit += self.readRate
+        n = min(int(self.readCredit), self.expectedSeqNum - self.readSeq)
+        if n:
+            self.readCredit -= n
+            for pkt in self.buffer.take_run(self.readSeq, n):
+                self.deliver(pkt.seqNum, pkt.data)
+            self.readSeq += n
+            # tell the sender the window opened if it was shut or has grown by
+            # half the buffer. smaller openings wait for the next ACK, so the
+            # sender isn't tempted into lots of tiny sends.
+            rwnd = self.window()
+            if self.lastAdvertised == 0 or rwnd - self.lastAdvertised >= max(1, self.capacity // 2):
+                self.windowUpdates += 1
+                if self.log: self.log(f"[Recv] Window update, rwnd {rwnd}", (200, 180, 0))
+                self.send_ack()
+        if self.readSeq < self.expectedSeqNum:
+            sched = self.channel.scheduler
+            self.readEvent = sched.schedule(sched.now + 1, self.on_read_event, priority=PRIORITY_TIMER)
+        else:
+            self.readCredit = 0.0   # nothing to read, don't save up for later
@@ -0,0 +1,285 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Deterministic record/replay for the UI's simulation. A
+Session owns the Channel/Sender/Receiver and every user input (send,
+auto on/off, kill) goes through it, stamped with the tick it happened
+on. The config is copied before the Channel starts eating its loss
+lists, so the recording plus the config is the whole run and replays
+exactly, headless and as fast as it goes. Every `checkpoint_every` ticks
+the state is pickled and compressed, so seek() only re-simulates from
+the nearest checkpoint instead of from zero.
+
+    python replay.py recording.json                     # replay to the end
+    python replay.py recording.json --until 50000
+    python replay.py recording.json --digest-every 1000 > a.txt
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import pickle
+import sys
+import time
+import zlib
+
+from channel import Channel
+from filetransfer import CountingSink
+from receiver import Receiver
+from sender import Sender
+
+# inputs
+SEND_NEW = "SEND_NEW"
+AUTO = "AUTO"       # arg: on/off
+KILL = "KILL"       # arg: (isAck, number, arrival tick) of the packet, see packet_key()
+
+RECORDING_VERSION = 1
+DEFAULT_CHECKPOINT_EVERY = 10000
+
+
+class Session:
+    def __init__(self, config, log_callback=None, verbose=False, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        # config: windowSize, timeoutInterval, totalPackets, delay, loss_data, loss_ack,
+        # optionally rwnd (receive buffer in segments, default windowSize)
+        self.config = dict(config)
+        self.config["loss_data"] = sorted(config.get("loss_data", ()))
+        self.config["loss_ack"] = sorted(config.get("loss_ack", ()))
+        self.log = log_callback
+        self.verbose = verbose
+        self.inputs = []            # (tick, command, arg), in the order they were applied
+        self.cursor = 0             # how many of them the current state has seen
+        self.checkpointEvery = checkpoint_every
+        self.checkpoints = []       # (tick, cursor, compressed state), oldest first
+        self.build()
+
+    def build(self):
+        # fresh objects for tick 0
+        c = self.config
+        self.channel = Channel(list(c["loss_data"]), list(c["loss_ack"]), c["delay"],
+                               log_callback=self.log, verbose=self.verbose)
+        self.sender = Sender(self.channel, c["windowSize"], c["timeoutInterval"], c["totalPackets"],
+                             log_callback=self.log, verbose=self.verbose)
+        # nothing reads the delivered data, and keeping it would make every
+        # checkpoint as big as the transfer so far. the buffer is as big as
+        # the window (like simulation.py without --rwnd), otherwise the
+        # default 64 segment rwnd quietly caps any bigger window.
+        self.receiver = Receiver(self.channel, log_callback=self.log, verbose=self.verbose, sink=CountingSink(),
+                                 capacity=c.get("rwnd") or c["windowSize"])
+        self.sender.set_receiver_ref(self.receiver)
+        self.receiver.set_sender_ref(self.sender)
+        self.scheduler = self.channel.scheduler
+        self.cursor = 0
+        self.nextCheckpoint = self.checkpointEvery
+
+    @property
+    def now(self):
+        return self.scheduler.now
+
+    def done(self):
+        return self.sender.base == self.sender.totalPackets
+
+    # --- inputs ---
+
+    def packet_key(self, packet, arrival=None):
+        # a packet in flight named so that a replay can find it again:
+        # (isAck, seq or ack number, tick it arrives on). None if it's not out there.
+        # duplicate ACKs share one object, so say which copy with its arrival tick.
+        entry = self.channel.find_entry(packet, arrival)
+        if entry is None:
+            return None
+        return (packet.isAck, packet.ackNum if packet.isAck else packet.seqNum, entry[1])
+
+    def apply(self, command, arg=None):
+        # a user input at the current tick. returns whatever it returned
+        # (False for a send into a full window or a kill that missed).
+        if self.cursor < len(self.inputs):
+            # we seeked back and are now doing something else, so the
+            # recorded future (and its checkpoints) doesn't happen any more
+            del self.inputs[self.cursor:]
+            now = self.now
+            self.checkpoints = [cp for cp in self.checkpoints
+                                if cp[0] < now or (cp[0] == now and cp[1] <= self.cursor)]
+        self.inputs.append((self.now, command, arg))
+        self.cursor += 1
+        return self.execute(command, arg)
+
+    def execute(self, command, arg):
+        if command == SEND_NEW:
+            return self.sender.attempt_send_one()
+        if command == AUTO:
+            self.sender.set_auto_send(bool(arg))
+            return True
+        if command == KILL:
+            isAck, num, arrival = arg
+            for entry in self.channel.buckets.get(arrival, ()):
+                pkt = entry[0]
+                if pkt is not None and pkt.isAck == isAck and (pkt.ackNum if isAck else pkt.seqNum) == num:
+                    return self.channel.kill_specific_packet(pkt, arrival)
+            return False
+        raise ValueError(f"unknown input {command!r}")
+
+    # --- running ---
+
+    def run_until(self, t):
+        # like scheduler.run_until(t), stopping to checkpoint on the way
+        every = self.checkpointEvery
+        while every and self.nextCheckpoint <= t:
+            self.scheduler.run_until(self.nextCheckpoint)
+            self.checkpoint()
+            self.nextCheckpoint += every
+        self.scheduler.run_until(t)
+
+    def run(self, until=None):
+        # as fast as it goes, until tick `until`, the end of the transfer or
+        # nothing left to do. stops on the tick the transfer finishes, same
+        # as the UI does.
+        sched = self.scheduler
+        while not self.done():
+            t = sched.next_time()
+            if t is None or (until is not None and t > until):
+                if until is not None and until > sched.now:
+                    self.run_until(until)
+                return
+            self.run_until(t)
+
+    def play(self, until=None):
+        # apply the recorded inputs still ahead of us and run to `until`
+        inputs = self.inputs
+        while self.cursor < len(inputs):
+            tick, command, arg = inputs[self.cursor]
+            if until is not None and tick > until:
+                break
+            self.run(tick)
+            self.cursor += 1
+            self.execute(command, arg)
+        self.run(until)
+
+    # --- checkpoints ---
+
+    def state_bytes(self):
+        # everything the simulation is, pickled. the log callback and the
+        # verbose flag are how we watch it, not part of it (and the callback
+        # is usually the UI), so they're left out.
+        objs = (self.channel, self.sender, self.receiver)
+        for obj in objs:
+            obj.log = None
+            obj.verbose = False
+        try:
+            return pickle.dumps(objs, pickle.HIGHEST_PROTOCOL)
+        finally:
+            self.hook(objs)
+
+    def hook(self, objs):
+        for obj in objs:
+            obj.log = self.log
+            obj.verbose = self.verbose
+
+    def digest(self):
+        # short fingerprint of the state, to compare two runs tick by tick.
+        # which equal strings pickle shares depends on whether the objects
+        # were built fresh or restored from a checkpoint, so the bytes go
+        # through one load/dump round trip first to come out the same.
+        data = pickle.dumps(pickle.loads(self.state_bytes()), pickle.HIGHEST_PROTOCOL)
+        return hashlib.sha1(data).hexdigest()[:16]
+
+    def checkpoint(self):
+        if self.checkpoints and self.checkpoints[-1][0] >= self.now:
+            return  # already have this one (we're re-running after a seek)
+        self.checkpoints.append((self.now, self.cursor, zlib.compress(self.state_bytes(), 1)))
+
+    def restore(self, blob, cursor):
+        objs = self.channel, self.sender, self.receiver = pickle.loads(zlib.decompress(blob))
+        self.hook(objs)
+        self.scheduler = self.channel.scheduler
+        self.cursor = cursor
+        every = self.checkpointEvery
+        self.nextCheckpoint = (self.now // every + 1) * every if every else None
+
+    def seek(self, t):
+        # put the state where it was at tick t (inputs on tick t included),
+        # starting from the last checkpoint at or before t
+        i = bisect.bisect_right([cp[0] for cp in self.checkpoints], t) - 1
+        if i < 0:
+            self.build()
+        else:
+            tick, cursor, blob = self.checkpoints[i]
+            self.restore(blob, cursor)
+        self.play(t)
+
+    def checkpoint_bytes(self):
+        return sum(len(cp[2]) for cp in self.checkpoints)
+
+    # --- recordings ---
+
+    def recording(self):
+        return {"version": RECORDING_VERSION, "config": self.config, "end": self.now,
+                "inputs": [list(i) for i in self.inputs[:self.cursor]]}
+
+
+def save_recording(recording, path):
+    with open(path, "w") as f:
+        json.dump(recording, f)
+
+
+def load_recording(path):
+    with open(path) as f:
+        recording = json.load(f)
+    if recording.get("version") != RECORDING_VERSION:
+        raise ValueError(f"{path}: unsupported recording version {recording.get('version')}")
+    return recording
+
+
+def load_session(recording, log_callback=None, verbose=False, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+    # a Session at tick 0 with the recorded inputs queued up, see play()
+    session = Session(recording["config"], log_callback, verbose, checkpoint_every)
+    # JSON turned the kill tuples into lists
+    session.inputs = [(tick, command, tuple(arg) if isinstance(arg, list) else arg)
+                      for tick, command, arg in recording["inputs"]]
+    return session
+
+
+def replay(recording, until=None, log_callback=None, verbose=False, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+    # a new Session that has gone through the recording up to `until`
+    # (default: where the recording ended)
+    session = load_session(recording, log_callback, verbose, checkpoint_every)
+    session.play(recording.get("end") if until is None else until)
+    return session
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recording saved from the UI.")
+    parser.add_argument("recording")
+    parser.add_argument("--until", type=int, default=None, help="stop at this tick (default: where it ended)")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY)
+    parser.add_argument("--digest-every", type=int, default=None,
+                        help="print a state fingerprint every N ticks, diff two of these to find where runs split")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording)
+    until = recording.get("end") if args.until is None else args.until
+    start = time.perf_counter()
+    session = load_session(recording, verbose=args.verbose, checkpoint_every=args.checkpoint_every)
+    if args.digest_every:
+        out = sys.stdout
+        t = 0
+        while until is None or t <= until:
+            session.play(t)
+            out.write(f"{t} {session.digest()}\n")
+            if session.done() or (not session.scheduler.pending() and session.cursor == len(session.inputs)):
+                break
+            t += args.digest_every
+    session.play(until)
+    elapsed = time.perf_counter() - start
+
+    sender = session.sender
+    print(f"tick {session.now:,}: {sender.base:,}/{sender.totalPackets:,} acked, {sender.retransmitCount} retransmits, "
+          f"{sender.timeoutCount} timeouts{' (done)' if session.done() else ''}")
+    print(f"{len(session.inputs)} inputs, {len(session.checkpoints)} checkpoints "
+          f"({session.checkpoint_bytes():,} bytes), {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Discrete-event scheduler. Keeps a heap of (due_time, event)
+so simulated time can jump straight to the next arrival or timeout
+instead of polling every tick.
+"""
+
+import heapq
+
+# lower number runs first when two events are due on the same tick.
+# arrivals go before timers, same as the old tick() -> tick_timer() order.
+PRIORITY_ARRIVAL = 0
+PRIORITY_TIMER = 1
+PRIORITY_SEND = 2   # auto-send refills the window after everything else on that tick
+
+
+class EventScheduler:
+    def __init__(self):
+        self.now = 0        # current simulated time in ticks
+        self.queue = []     # heap of [due, priority, order, callback, arg]
+        self.order = 0      # tie breaker so same-time events keep FIFO order
+
+    def schedule(self, due, callback, arg=None, priority=PRIORITY_ARRIVAL):
+        # returns the event so the caller can cancel it later
+        event = [due, priority, self.order, callback, arg]
+        self.order += 1
+        heapq.heappush(self.queue, event)
+        return event
+
+    def cancel(self, event):
+        # lazy delete: just blank the callback, it gets skipped when popped
+        event[3] = None
+
+    def next_time(self):
+        # throw away cancelled events sitting on top of the heap
+        while self.queue and self.queue[0][3] is None:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+    def pending(self):
+        return self.next_time() is not None
+
+    def run_until(self, t):
+        # fire everything due up to and including time t, then park the clock at t
+        queue = self.queue
+        while queue and queue[0][0] <= t:
+            due, _, _, callback, arg = heapq.heappop(queue)
+            if callback is None:
+                continue
+            self.now = due
+            callback(arg)
+        self.now = t
+
+    def advance(self, ticks=1):
+        # compatibility helper for the tick based UI loop
+        self.run_until(self.now + ticks)
+
+    def run_next(self):
+        # jump straight to the next event time and run everything due then.
+        # returns False if there was nothing left to do.
+        t = self.next_time()
+        if t is None:
+            return False
+        self.run_until(max(t, self.now))
+        return True
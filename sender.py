@@ -7,32 +7,115 @@ window, manages the retransmission timer, and detects when to fast
 retransmit.
 """
 
+import math
+
+from checksum import seal, verify
 from packet import Packet
+from scheduler import PRIORITY_TIMER, PRIORITY_SEND
+from tracer import (ACK, DROP, DROP_CHECKSUM, DUP_ACK, FAST_RETRANSMIT, PROBE, RETRANSMIT, SEND, SENDER,
+                    TIMEOUT)
+
+# how far timeouts back the RTO off: 4x the current estimate. before the first
+# RTT sample it's at least RFC 6298's 1 s initial RTO (1 tick = 1 ms), so a
+# timeout that starts below the real RTT can back off past it and get a clean
+# sample. the estimate itself is never capped.
+MAX_RTO_BACKOFF = 4
+MIN_BACKOFF_CAP = 1000
 
 class Sender:
-    def __init__(self, channel, windowSize, timeoutInterval, totalPackets, log_callback=None):
+    def __init__(self, channel, windowSize, timeoutInterval, totalPackets, log_callback=None, verbose=True, sack=False,
+                 adaptiveRto=False, minRto=1, maxRto=None, cc=None, checksum=None, tracer=None):
         self.channel = channel
         self.windowSize = windowSize      
         self.timeoutInterval = timeoutInterval
         self.totalPackets = totalPackets
         self.log = log_callback # helps print to the ui screen
+        self.verbose = verbose  # turn off terminal prints for headless runs
+        self.trace = tracer     # structured event tracer (tracer.py) or None
         
         # tracking the window state
         self.base = 0              # oldest packet we haven't got an ack for yet
         self.nextSeqNum = 0        # next sequence number to be sent
-        self.timerCount = 0        
         self.timerRunning = False  
+        self.timerStart = 0        # tick the timer was (re)started on
+        self.timerDeadline = 0     # tick the timer fires on
+        self.timerEvent = None     # pending timeout event in the scheduler
         self.dupAckCount = 0       # counts duplicates for fast retransmit
+
+        # running totals so a headless run can report what happened
+        self.retransmitCount = 0
+        self.timeoutCount = 0
+        self.totalDupAcks = 0
         
+        # SACK mode: a scoreboard of what the receiver has buffered, so every
+        # hole can be resent in one round instead of one hole per timeout
+        self.sack = sack
+        self.sacked = set()        # seqs above base the receiver told us it has
+        self.highSack = 0          # one past the highest sacked seq
+        self.retransmitted = set() # holes already resent in this recovery
+
+        # adaptive RTO (RFC 6298). timeoutInterval becomes the current RTO and
+        # is recomputed from RTT samples, starting from the configured value.
+        self.adaptiveRto = adaptiveRto
+        self.minRto = minRto
+        # the estimate before any backoff (SRTT + 4*RTTVAR once there's a sample)
+        self.rto = timeoutInterval
+        # fixed cap on the backoff instead of backoff_cap()'s default
+        self.maxRto = maxRto
+        self.srtt = None
+        self.rttvar = None
+        self.rttSamples = 0
+        # first send time of each unacked seq, None once it's been resent
+        # (Karn's algorithm: an ACK for a resent segment is ambiguous)
+        self.sendTimes = {}
+        self.resendTimes = {}      # unacked seq -> tick it was last resent on
+
+        # congestion control (see congestion.py). None means just use windowSize,
+        # otherwise windowSize is the upper limit and cwnd decides the rest.
+        self.cc = cc
+        if cc is not None:
+            cc.maxCwnd = windowSize
+        # RTT samples feed the RTO and the congestion controller (CUBIC's
+        # curve runs in RTTs), so keep send times if either wants them
+        self.timeSegments = adaptiveRto or cc is not None
+
+        # checksum function from checksum.py (None = off). data segments get
+        # sealed with it and ACKs that don't verify are thrown away.
+        self.checksum = checksum
+        self.corruptCount = 0
+
+        # flow control: the receiver's advertised window (None until an ACK
+        # brings one). with a zero window and nothing in flight the persist
+        # timer sends probes so we find out when it opens again.
+        self.rwnd = None
+        self.persistEvent = None
+        self.persistInterval = None # current probe interval, backs off like the RTO
+        self.probeCount = 0
+
+        # auto-send mode: keep the window full without anyone clicking "Send New"
+        self.autoSend = False
+        self.fillPending = False   # a refill is already queued for this tick
+
         self.receiver_ref = None   
 
     def set_receiver_ref(self, receiver):
         self.receiver_ref = receiver
+        # this is our "connection setup", so learn the receiver's starting
+        # window here like TCP does from the SYN/ACK
+        if receiver is not None:
+            self.rwnd = receiver.window()
+
+    def effective_window(self):
+        # how many packets we may have in flight right now
+        window = self.windowSize if self.cc is None else min(self.windowSize, self.cc.window())
+        if self.rwnd is not None and self.rwnd < window:
+            return self.rwnd
+        return window
 
     def is_window_full(self):
         # helper so the UI knows if it should disable the send button.
         # we also need to stop if we hit the total packet limit.
-        return (self.nextSeqNum >= self.base + self.windowSize) or \
+        return (self.nextSeqNum >= self.base + self.effective_window()) or \
                (self.nextSeqNum >= self.totalPackets)
 
     def attempt_send_one(self):
@@ -40,11 +123,17 @@ class Sender:
         # first, check if we actually have space in the window
         if not self.is_window_full():
             
-            pkt = Packet(seqNum=self.nextSeqNum, data=f"Msg{self.nextSeqNum}")
+            pkt = self.new_packet(self.nextSeqNum)
             
             if self.log: self.log(f"[Sender] Manually Sent {self.nextSeqNum}")
-            print(f" [Sender] Sending Data {self.nextSeqNum}")
+            if self.verbose: print(f" [Sender] Sending Data {self.nextSeqNum}")
             
+            if self.timeSegments:
+                self.sendTimes[self.nextSeqNum] = self.channel.scheduler.now
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, SEND, SENDER, self.nextSeqNum,
+                                  value=self.nextSeqNum + 1 - self.base)
+
             # send it off to the channel
             self.channel.send_to_channel(pkt, self.receiver_ref)
             
@@ -57,58 +146,358 @@ class Sender:
         else:
             return False # tell UI it failed (window full)
 
+    def send_burst(self, n=None):
+        # send up to n new segments (or as many as the window allows if n is
+        # None) and give them to the channel in one batch. returns how many went.
+        limit = min(self.base + self.effective_window(), self.totalPackets)
+        if n is not None:
+            limit = min(limit, self.nextSeqNum + n)
+        if self.nextSeqNum >= limit:
+            return 0
+
+        first = self.nextSeqNum
+        pkts = [self.new_packet(seq) for seq in range(first, limit)]
+        if self.log or self.verbose:
+            for seq in range(first, limit):
+                if self.log: self.log(f"[Sender] Sent {seq}")
+                if self.verbose: print(f" [Sender] Sending Data {seq}")
+
+        if self.timeSegments:
+            now = self.channel.scheduler.now
+            for seq in range(first, limit):
+                self.sendTimes[seq] = now
+        if self.trace is not None:
+            now = self.channel.scheduler.now
+            for seq in range(first, limit):
+                self.trace.record(now, SEND, SENDER, seq, value=seq + 1 - self.base)
+
+        self.channel.send_batch(pkts, self.receiver_ref)
+
+        # only one timer start for the whole burst, if the window was empty
+        if self.base == first:
+            self.start_timer()
+        self.nextSeqNum = limit
+        return limit - first
+
+    def fill_window(self):
+        return self.send_burst()
+
+    def set_auto_send(self, on):
+        self.autoSend = on
+        if on:
+            self.fill_window()
+
+    def request_fill(self):
+        # auto-send: refill once at the end of this tick (after all arrivals
+        # and timeouts) so everything the ACKs freed up goes out as one burst
+        if not self.fillPending:
+            self.fillPending = True
+            sched = self.channel.scheduler
+            sched.schedule(sched.now, self.on_fill_event, priority=PRIORITY_SEND)
+
+    def on_fill_event(self, _):
+        self.fillPending = False
+        if self.autoSend:
+            self.fill_window()
+
+    def payload(self, seq):
+        # the application data for a segment
+        return f"Msg{seq}"
+
+    def new_packet(self, seq):
+        pkt = Packet(seq, False, -1, self.payload(seq))
+        if self.checksum is not None:
+            seal(pkt, self.checksum)
+        return pkt
+
     def receive(self, packet):
+        # a damaged ACK could say anything, drop it like it never came
+        if self.checksum is not None and not verify(packet, self.checksum):
+            self.corruptCount += 1
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, DROP, SENDER, ack=packet.ackNum, value=DROP_CHECKSUM)
+            if self.log: self.log("[Sender] Bad checksum, ACK dropped", (255, 0, 0))
+            return
+
         # ignore data packets, we only care about ACKs here
         if not packet.isAck: return
 
-        print(f" [Sender] Received ACK {packet.ackNum}")
+        if self.verbose: print(f" [Sender] Received ACK {packet.ackNum}")
+
+        if self.sack and packet.sackBlocks:
+            self.update_scoreboard(packet.sackBlocks)
+
+        # take the advertised window from anything that isn't an old ACK
+        window_changed = False
+        if packet.rwnd is not None and packet.ackNum >= self.base:
+            window_changed = packet.rwnd != self.rwnd
+            self.rwnd = packet.rwnd
 
         # if the ack number is greater than our base, it's a "New ACK"
         # this means the receiver got new data, so we can slide the window.
         if packet.ackNum > self.base:
+            if self.timeSegments:
+                self.sample_rtt(packet.ackNum)
+            if self.cc is not None:
+                self.cc.on_ack(packet.ackNum - self.base, self.channel.scheduler.now)
             self.base = packet.ackNum
-            self.timerRunning = False
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, ACK, SENDER, ack=packet.ackNum,
+                                  value=self.effective_window())
+            # a zero window probe that got accepted acks past what we've sent
+            if self.nextSeqNum < self.base:
+                self.nextSeqNum = self.base
+            self.stop_timer()
             self.dupAckCount = 0 # reset this since we made progress
+            if self.sacked or self.retransmitted:
+                self.prune_scoreboard()
             
             if self.log: self.log(f"[Sender] Got ACK {packet.ackNum}", (0, 100, 0))
             
             # restart timer if there are still packets left in the window
             if self.base < self.nextSeqNum:
                 self.start_timer()
+
+            if self.autoSend:
+                self.request_fill()
                 
+        # same ACK number but a different window: the receiver's app read
+        # some data. it's not a sign of loss, so it doesn't count as a dup.
+        elif packet.ackNum == self.base and (window_changed or self.base == self.nextSeqNum):
+            if self.log and window_changed: self.log(f"[Sender] Window update {self.rwnd}", (0, 100, 0))
+            if self.autoSend and self.rwnd:
+                self.request_fill()
+
         # if the ack is the same as the base, it's a duplicate.
         # this usually means the receiver got a packet out of order.
         elif packet.ackNum == self.base:
             self.dupAckCount += 1
+            self.totalDupAcks += 1
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, DUP_ACK, SENDER, ack=packet.ackNum,
+                                  value=self.dupAckCount)
             if self.log: self.log(f"[Sender] Dup ACK {packet.ackNum} ({self.dupAckCount})", (200, 100, 0))
+            if self.cc is not None:
+                self.cc.on_dup_ack(self.dupAckCount, self.channel.scheduler.now)
             
             # Fast Retransmit: if we get 3 duplicates (so 4 total), we assume loss
             # and resend immediately without waiting for timeout.
             if self.dupAckCount == 3: 
                 msg = "!!! FAST RETRANSMIT !!!"
-                print(msg)
+                if self.trace is not None:
+                    self.trace.record(self.channel.scheduler.now, FAST_RETRANSMIT, SENDER, self.base,
+                                      value=self.nextSeqNum - self.base)
+                if self.verbose: print(msg)
                 if self.log: self.log(msg, (255, 0, 0))
+                if self.cc is not None:
+                    self.cc.on_fast_retransmit(self.nextSeqNum - self.base, self.channel.scheduler.now)
                 self.retransmit()
+            elif self.dupAckCount > 3 and self.sack:
+                # still in recovery: newer SACKs may have shown more holes
+                self.retransmit_holes()
+
+            # fast recovery may have opened the window for new packets
+            if self.autoSend and self.cc is not None and self.cc.inRecovery:
+                self.request_fill()
+
+        if self.rwnd is not None:
+            self.check_persist()
+
+    def check_persist(self):
+        # start the persist timer when the receiver has no room and we have
+        # nothing in flight (so no ACK is coming to tell us when it opens)
+        if self.rwnd == 0 and self.base == self.nextSeqNum < self.totalPackets:
+            if self.persistEvent is None:
+                if self.persistInterval is None:
+                    self.persistInterval = self.timeoutInterval
+                sched = self.channel.scheduler
+                self.persistEvent = sched.schedule(sched.now + self.persistInterval, self.on_persist_event,
+                                                   priority=PRIORITY_TIMER)
+        elif self.persistEvent is not None:
+            self.channel.scheduler.cancel(self.persistEvent)
+            self.persistEvent = None
+            self.persistInterval = None
+
+    def on_persist_event(self, _):
+        self.persistEvent = None
+        if not (self.rwnd == 0 and self.base == self.nextSeqNum < self.totalPackets):
+            self.persistInterval = None
+            return
+        # zero window probe: the next segment, sent even though there's no room.
+        # if the window has opened it gets accepted, if not the receiver drops
+        # it, and either way its ACK carries the current window.
+        if self.log: self.log(f"[Sender] Zero window probe {self.nextSeqNum}", (200, 100, 0))
+        if self.verbose: print(f" [Sender] Zero window probe {self.nextSeqNum}")
+        self.probeCount += 1
+        if self.trace is not None:
+            self.trace.record(self.channel.scheduler.now, PROBE, SENDER, self.nextSeqNum)
+        self.channel.send_to_channel(self.new_packet(self.nextSeqNum), self.receiver_ref)
+        # back off like the retransmission timer does
+        self.persistInterval = min(self.backoff_cap(), self.persistInterval * 2)
+        sched = self.channel.scheduler
+        self.persistEvent = sched.schedule(sched.now + self.persistInterval, self.on_persist_event,
+                                           priority=PRIORITY_TIMER)
+
+    def sample_rtt(self, ackNum):
+        # take an RTT sample from the newest segment this ACK covers, if that
+        # one was only sent once (Karn). older segments it covers may have
+        # been resent, after a timeout every cumulative ACK does, and skipping
+        # those would leave the RTO backed off for good. it also has to have
+        # been sent after every resend this ACK covers, or the ACK may have
+        # waited for a resend to fill a hole and the sample would count the
+        # whole backoff. also forgets the send times of everything acked.
+        times = self.sendTimes
+        resends = self.resendTimes
+        sent = None
+        lastResend = None
+        for seq in range(self.base, ackNum):
+            sent = times.pop(seq, None)
+            if resends:
+                resent = resends.pop(seq, None)
+                if resent is not None and (lastResend is None or resent > lastResend):
+                    lastResend = resent
+        if sent is not None and (lastResend is None or sent >= lastResend):
+            rtt = self.channel.scheduler.now - sent
+            if self.adaptiveRto:
+                self.update_rto(rtt)
+            if self.cc is not None:
+                self.cc.on_rtt(rtt)
+
+    def update_rto(self, rtt):
+        # RFC 6298 section 2, with alpha = 1/8, beta = 1/4, K = 4 and a clock
+        # granularity of one tick
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rttSamples += 1
+        self.rto = max(self.minRto, math.ceil(self.srtt + max(1, 4 * self.rttvar)))
+        # a fresh sample also undoes any timeout backoff
+        self.timeoutInterval = self.rto
+
+    def backoff_cap(self):
+        if self.maxRto is not None:
+            return self.maxRto
+        if self.srtt is None:
+            # no sample yet, the configured timeout may be way below the RTT
+            return max(MIN_BACKOFF_CAP, MAX_RTO_BACKOFF * self.rto)
+        return MAX_RTO_BACKOFF * self.rto
+
+    def mark_retransmitted(self, seq):
+        # Karn: never take an RTT sample from a segment that was sent twice
+        if seq in self.sendTimes:
+            self.sendTimes[seq] = None
+            self.resendTimes[seq] = self.channel.scheduler.now
+
+    def update_scoreboard(self, blocks):
+        for start, end in blocks:
+            start = max(start, self.base)
+            if end > start:
+                self.sacked.update(range(start, end))
+                if end > self.highSack:
+                    self.highSack = end
+
+    def prune_scoreboard(self):
+        # forget everything the cumulative ACK already covers
+        base = self.base
+        self.sacked = {s for s in self.sacked if s >= base}
+        self.retransmitted = {s for s in self.retransmitted if s >= base}
+        if self.highSack <= base:
+            self.highSack = 0
+
+    def retransmit_holes(self, timeout=False):
+        # resend every seq between base and the highest SACK that the receiver
+        # doesn't have and we haven't already resent. returns how many went.
+        end = max(self.highSack, self.base + 1)
+        holes = [s for s in range(self.base, min(end, self.totalPackets))
+                 if s not in self.sacked and s not in self.retransmitted]
+        if not holes:
+            return 0
+        if self.log: self.log(f"[Sender] SACK re-sending {holes}", (255, 0, 0))
+        self.retransmitted.update(holes)
+        self.retransmitCount += len(holes)
+        if self.timeSegments:
+            for seq in holes:
+                self.mark_retransmitted(seq)
+        if self.trace is not None:
+            now = self.channel.scheduler.now
+            for seq in holes:
+                self.trace.record(now, RETRANSMIT, SENDER, seq, value=int(timeout))
+        self.channel.send_batch([self.new_packet(s) for s in holes], self.receiver_ref)
+        return len(holes)
+
+    @property
+    def timerCount(self):
+        # how long the timer has been running (for the UI status line)
+        if not self.timerRunning:
+            return 0
+        return self.channel.scheduler.now - self.timerStart
 
     def tick_timer(self):
-        # this runs every frame of the simulation
-        if self.timerRunning:
-            self.timerCount += 1
-            # check if we passed the limit
-            if self.timerCount >= self.timeoutInterval:
-                msg = "!!! TIMEOUT !!!"
-                print(msg)
-                if self.log: self.log(msg, (255, 0, 0))
-                self.retransmit()
-                self.start_timer() # restart immediately after timeout
+        # compatibility shim: the timeout is now an event on the channel's
+        # scheduler, so Channel.tick() already fires it when it's due.
+        pass
+
+    def on_timer_event(self, _):
+        self.timerEvent = None
+        if not self.timerRunning:
+            return
+        now = self.channel.scheduler.now
+        # the timer got restarted since this event was queued, so re-arm it
+        # for the new deadline instead of pushing an event on every ACK
+        if now < self.timerDeadline:
+            self.timerEvent = self.channel.scheduler.schedule(
+                self.timerDeadline, self.on_timer_event, priority=PRIORITY_TIMER)
+            return
+
+        msg = "!!! TIMEOUT !!!"
+        if self.verbose: print(msg)
+        if self.log: self.log(msg, (255, 0, 0))
+        self.timeoutCount += 1
+        if self.adaptiveRto:
+            # exponential backoff until the next clean RTT sample. the cap
+            # only stops the doubling, it never pulls the RTO down.
+            self.timeoutInterval = max(self.timeoutInterval, min(self.backoff_cap(), self.timeoutInterval * 2))
+        if self.trace is not None:
+            self.trace.record(now, TIMEOUT, SENDER, self.base, value=int(self.timeoutInterval))
+        if self.cc is not None:
+            self.cc.on_timeout(self.nextSeqNum - self.base, self.channel.scheduler.now)
+        self.retransmit(timeout=True)
+        self.start_timer() # restart immediately after timeout
 
     def start_timer(self):
-        self.timerCount = 0
+        sched = self.channel.scheduler
+        self.timerStart = sched.now
+        self.timerDeadline = sched.now + self.timeoutInterval
         self.timerRunning = True
+        # keep at most one pending event. if it's due later than the new
+        # deadline (timeout got shorter), replace it.
+        if self.timerEvent is not None and self.timerEvent[0] > self.timerDeadline:
+            sched.cancel(self.timerEvent)
+            self.timerEvent = None
+        if self.timerEvent is None:
+            self.timerEvent = sched.schedule(self.timerDeadline, self.on_timer_event, priority=PRIORITY_TIMER)
+
+    def stop_timer(self):
+        # the pending event is left in place and ignored when it fires
+        self.timerRunning = False
 
-    def retransmit(self):
+    def retransmit(self, timeout=False):
+        if self.sack:
+            # a timeout means our resends may have been lost too, so start over
+            if timeout:
+                self.retransmitted.clear()
+            self.retransmit_holes(timeout)
+            return
         # only retransmit the oldest packet (base) that hasn't been acked yet
         if self.base < self.totalPackets:
             if self.log: self.log(f"[Sender] Re-sending {self.base}", (255, 0, 0))
-            pkt = Packet(seqNum=self.base, data=f"Msg{self.base}")
+            pkt = self.new_packet(self.base)
+            self.retransmitCount += 1
+            if self.timeSegments:
+                self.mark_retransmitted(self.base)
+            if self.trace is not None:
+                self.trace.record(self.channel.scheduler.now, RETRANSMIT, SENDER, self.base, value=int(timeout))
             self.channel.send_to_channel(pkt, self.receiver_ref)
\ No newline at end of file
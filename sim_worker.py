@@ -0,0 +1,182 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Runs the Channel/Sender/Receiver for the UI in a worker
+thread. The UI never touches the simulation objects: it sends commands
+(send, auto, pause, kill, speed, save, stop) over a queue and reads the
+latest Snapshot, an immutable tuple the worker swaps in after every batch
+of ticks, so the drawing side needs no locks. Log lines come back over a
+second queue. The simulation itself is a replay.Session, so every input
+is recorded and the run can be saved and replayed.
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from replay import AUTO, KILL, SEND_NEW, Session, save_recording
+
+# longest the worker runs the simulation before publishing a snapshot and
+# checking for commands again. if it can't keep up with the speed it
+# falls behind instead of starving the UI.
+SLICE = 0.004
+IDLE_WAIT = 0.05    # how often a paused worker wakes up (commands wake it sooner)
+
+# everything the UI draws, copied out of the simulation in one go.
+# packets: (handle, isAck, number, ticks_remaining, total_delay) per packet
+# in flight, where handle is (Packet, arrival tick), only to be passed back
+# in a KILL command. the tick says which copy when duplicate ACKs (one
+# object) are in flight together. wall is time.perf_counter() when the snapshot was taken, so
+# the UI can place packets in between ticks.
+Snapshot = namedtuple("Snapshot", [
+    "now", "wall", "speed", "paused", "done",
+    "base", "nextSeqNum", "timerCount", "timeoutInterval", "windowSize", "totalPackets",
+    "autoSend", "windowFull",
+    "expectedSeqNum", "readSeq", "buffered", "rwnd",
+    "packets",
+])
+
+# commands, besides the recorded inputs SEND_NEW, AUTO (arg: on/off) and
+# KILL (arg: a packet handle from a snapshot) from replay.py
+PAUSE = "PAUSE"     # arg: paused or not
+SPEED = "SPEED"     # arg: ticks per second
+SAVE = "SAVE"       # arg: path to write the recording to
+STOP = "STOP"
+
+black = (0, 0, 0)
+red = (255, 50, 50)
+orange = (255, 165, 0)
+green = (50, 200, 50)
+
+
+class SimWorker:
+    def __init__(self, windowSize, timeoutInterval, totalPackets, delay, loss_data=(), loss_ack=(), speed=15):
+        self.commands = queue.SimpleQueue()
+        self.logs = queue.SimpleQueue()     # (text, color) for the UI's event log
+
+        # the worker owns this once start() is called
+        config = {"windowSize": windowSize, "timeoutInterval": timeoutInterval, "totalPackets": totalPackets,
+                  "delay": delay, "loss_data": loss_data, "loss_ack": loss_ack}
+        self.session = Session(config, log_callback=self.log, verbose=True)
+
+        self.speed = speed      # ticks per second
+        self.paused = False
+        self.done = False
+        self.clock = 0.0        # where the simulation should be, in ticks
+        self.snapshot = None
+        self.publish()
+        self.thread = threading.Thread(target=self.run, name="sim-worker", daemon=True)
+
+    def log(self, text, color=black):
+        self.logs.put((text, color))
+
+    # --- called from the UI thread ---
+
+    def start(self):
+        self.thread.start()
+
+    def send(self, command, arg=None):
+        self.commands.put((command, arg))
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.send(STOP)
+            self.thread.join()
+
+    # --- worker thread ---
+
+    def publish(self):
+        session = self.session
+        sender = session.sender
+        receiver = session.receiver
+        now = session.now
+        packets = tuple(((pkt, now + ticks), pkt.isAck, pkt.ackNum if pkt.isAck else pkt.seqNum, ticks, total)
+                        for pkt, ticks, _, total in session.channel.in_transit)
+        buffered = tuple(receiver.buffer) if receiver.buffer.count else ()
+        # one reference assignment, so the UI sees either the old snapshot or the new one
+        self.snapshot = Snapshot(now, time.perf_counter(), self.speed, self.paused, self.done,
+                                 sender.base, sender.nextSeqNum, sender.timerCount, sender.timeoutInterval,
+                                 sender.windowSize, sender.totalPackets, sender.autoSend, sender.is_window_full(),
+                                 receiver.expectedSeqNum, receiver.readSeq, buffered, receiver.window(),
+                                 packets)
+
+    def handle(self, command, arg):
+        # returns False once told to stop
+        session = self.session
+        if command == STOP:
+            return False
+        if command == SEND_NEW:
+            if not session.apply(SEND_NEW):
+                self.log("Window Full!", orange)
+        elif command == AUTO:
+            session.apply(AUTO, arg)
+        elif command == PAUSE:
+            self.paused = arg
+            self.clock = session.now
+        elif command == KILL:
+            # recorded by where the packet is, not by the object
+            pkt, arrival = arg
+            key = session.packet_key(pkt, arrival)
+            if key is not None and session.apply(KILL, key):
+                name = f"ACK {pkt.ackNum}" if pkt.isAck else f"Data {pkt.seqNum}"
+                self.log(f"KILLED {name} (User Click)", red)
+        elif command == SPEED:
+            self.speed = arg
+        elif command == SAVE:
+            save_recording(session.recording(), arg)
+            self.log(f"Saved recording to {arg} (tick {session.now})", green)
+        return True
+
+    def run(self):
+        sched = self.session.scheduler
+        last = time.perf_counter()
+        while True:
+            # sleep until the next tick is due, or until a command comes in
+            if self.paused or self.done:
+                wait = IDLE_WAIT
+            else:
+                wait = (sched.now + 1 - self.clock) / self.speed
+            try:
+                command = self.commands.get(timeout=wait) if wait > 0 else self.commands.get_nowait()
+            except queue.Empty:
+                command = None
+            while command is not None:
+                if not self.handle(*command):
+                    return
+                try:
+                    command = self.commands.get_nowait()
+                except queue.Empty:
+                    command = None
+
+            wall = time.perf_counter()
+            if not (self.paused or self.done):
+                self.clock += (wall - last) * self.speed
+                self.step(wall + SLICE)
+            last = wall
+            self.publish()
+
+    def step(self, deadline):
+        # run every event due by the clock, until the deadline
+        session = self.session
+        sched = session.scheduler
+        target = int(self.clock)
+        while sched.now < target:
+            t = sched.next_time()
+            if t is None or t > target:
+                session.run_until(target)
+                break
+            session.run_until(t)
+
+            if session.done():
+                print("\n--- SIMULATION DONE ---\n")
+                self.log("DONE!", green)
+                self.done = True
+                self.paused = True
+                self.clock = sched.now
+                return
+            if time.perf_counter() > deadline:
+                # too slow for this speed, pick up from here
+                self.clock = sched.now
+                return
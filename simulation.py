@@ -0,0 +1,307 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Headless simulation runner. Wires up the Channel, Sender
+and Receiver without pygame and runs ticks as fast as possible until
+every packet has been acknowledged.
+"""
+
+import argparse
+import time
+
+from channel import Channel
+from channel_models import build_models
+from checksum import get_algorithm
+from congestion import make_cc
+from filetransfer import MSS, BulkSender, FileSender, FileSink, map_file
+from link import DEFAULT_LIMIT, QUEUES, Link, make_queue
+from sender import Sender
+from receiver import Receiver
+from tracer import DEFAULT_CAPACITY as TRACE_CAPACITY, Tracer
+from wire import HEADER_SIZE
+
+
+class SimResult:
+    def __init__(self, ticks, packets, retransmits, timeouts, dup_acks,
+                 receiver_dups, wall_time, completed, dropped=0, corrupted=0, probes=0, acks=0,
+                 queue_drops=0, avg_queue=0.0, max_queue=0, avg_sojourn=0.0, max_sojourn=0.0,
+                 link_utilization=0.0):
+        self.ticks = ticks                  # simulated ticks until the last ACK
+        self.packets = packets              # packets delivered in order (read by the app)
+        self.retransmits = retransmits
+        self.timeouts = timeouts
+        self.dup_acks = dup_acks            # duplicate ACKs seen by the sender
+        self.receiver_dups = receiver_dups  # old data packets the receiver ignored
+        self.wall_time = wall_time          # seconds of real time the run took
+        self.completed = completed          # False if we hit max_ticks first
+        self.dropped = dropped              # packets the channel lost
+        self.corrupted = corrupted          # packets thrown away for a bad checksum
+        self.probes = probes                # zero window probes the sender had to send
+        self.acks = acks                    # ACKs the receiver sent
+        # bottleneck queue metrics (all zero without --bandwidth), see Link.stats()
+        self.queue_drops = queue_drops
+        self.avg_queue = avg_queue          # time-averaged packets in the queue
+        self.max_queue = max_queue
+        self.avg_sojourn = avg_sojourn      # ticks a packet waited before being sent
+        self.max_sojourn = max_sojourn
+        self.link_utilization = link_utilization
+        self.cc_history = []                # (tick, cwnd, ssthresh) with congestion control on
+
+    @property
+    def goodput(self):
+        # useful packets delivered per simulated tick
+        return self.packets / self.ticks if self.ticks else 0.0
+
+    def as_dict(self):
+        return {
+            "ticks": self.ticks,
+            "packets": self.packets,
+            "retransmits": self.retransmits,
+            "timeouts": self.timeouts,
+            "dup_acks": self.dup_acks,
+            "receiver_dups": self.receiver_dups,
+            "dropped": self.dropped,
+            "corrupted": self.corrupted,
+            "probes": self.probes,
+            "acks": self.acks,
+            "queue_drops": self.queue_drops,
+            "avg_queue": self.avg_queue,
+            "max_queue": self.max_queue,
+            "avg_sojourn": self.avg_sojourn,
+            "max_sojourn": self.max_sojourn,
+            "link_utilization": self.link_utilization,
+            "goodput": self.goodput,
+            "wall_time": self.wall_time,
+            "completed": self.completed,
+        }
+
+    def __repr__(self):
+        return (f"SimResult(ticks={self.ticks}, packets={self.packets}, "
+                f"retransmits={self.retransmits}, dup_acks={self.dup_acks}, "
+                f"goodput={self.goodput:.4f} pkt/tick)")
+
+
+class Simulation:
+    def __init__(self, windowSize, timeoutInterval, totalPackets, delay,
+                 loss_data=None, loss_ack=None, max_ticks=None, models=None, sack=False,
+                 adaptive_rto=False, cc=None, checksum=None, source=None, sink=None, mss=MSS,
+                 rwnd=None, read_rate=None, delayed_ack=None, ack_every=2,
+                 bandwidth=None, queue="droptail", queue_limit=DEFAULT_LIMIT, queue_options=None, seed=None,
+                 tracer=None):
+        # bandwidth (bytes per tick) puts a bottleneck link with a finite queue
+        # in front of the data path, see link.py
+        link = None
+        if bandwidth:
+            link = Link(bandwidth, make_queue(queue, queue_limit, seed, **(queue_options or {})))
+        # copy the loss lists since the channel removes entries as it drops them
+        self.channel = Channel(list(loss_data or []), list(loss_ack or []), delay,
+                               verbose=False, models=models, link=link, tracer=tracer)
+        options = dict(verbose=False, sack=sack, adaptiveRto=adaptive_rto, cc=make_cc(cc),
+                       checksum=get_algorithm(checksum), tracer=tracer)
+        if source is not None:
+            # file mode: the payloads are the file's bytes (totalPackets is ignored)
+            self.sender = FileSender(self.channel, windowSize, timeoutInterval, source, mss, **options)
+        elif link is not None:
+            # the link's serialization time comes from the payload size, so
+            # give the dummy segments a full mss of data
+            self.sender = BulkSender(self.channel, windowSize, timeoutInterval, totalPackets, mss, **options)
+        else:
+            self.sender = Sender(self.channel, windowSize, timeoutInterval, totalPackets, **options)
+        # the receive buffer holds rwnd segments (a full window unless told
+        # otherwise), read_rate is how fast the app empties it (None = instantly)
+        self.receiver = Receiver(self.channel, verbose=False, sack=sack, checksum=options["checksum"],
+                                 sink=sink, capacity=rwnd or windowSize, readRate=read_rate,
+                                 ackDelay=delayed_ack, ackEvery=ack_every, tracer=tracer)
+
+        self.sender.set_receiver_ref(self.receiver)
+        self.receiver.set_sender_ref(self.sender)
+
+        self.max_ticks = max_ticks
+
+    @property
+    def ticks(self):
+        return self.channel.scheduler.now
+
+    def step(self):
+        # jump to the next event time (arrival, timeout or refill) instead of
+        # ticking through the idle ones. returns False when there's nothing left.
+        sched = self.channel.scheduler
+        t = sched.next_time()
+        if t is None:
+            return False
+        if self.max_ticks is not None and t > self.max_ticks:
+            sched.run_until(self.max_ticks)
+            return False
+        sched.run_next()
+        return True
+
+    def done(self):
+        # everything ACKed and read by the receiving app. with a read rate the
+        # tail can still be sitting in the receive buffer after the last ACK,
+        # and in file mode the sink gets closed as soon as we stop.
+        return self.sender.base == self.sender.totalPackets and self.receiver.readSeq == self.receiver.expectedSeqNum
+
+    def run(self):
+        start = time.perf_counter()
+        # auto-send keeps the window full from here on
+        self.sender.set_auto_send(True)
+        while not self.done():
+            if not self.step():
+                break
+        return self.result(time.perf_counter() - start)
+
+    def result(self, wall_time=0.0):
+        link = self.channel.link
+        queue_stats = link.stats(self.ticks) if link is not None else {}
+        res = SimResult(
+            ticks=self.ticks,
+            packets=self.receiver.readSeq,
+            retransmits=self.sender.retransmitCount,
+            timeouts=self.sender.timeoutCount,
+            dup_acks=self.sender.totalDupAcks,
+            receiver_dups=self.receiver.duplicateCount,
+            wall_time=wall_time,
+            completed=self.done(),
+            dropped=self.channel.dropCount,
+            corrupted=self.sender.corruptCount + self.receiver.corruptCount,
+            probes=self.sender.probeCount,
+            acks=self.receiver.ackCount,
+            **queue_stats,
+        )
+        if self.sender.cc is not None:
+            res.cc_history = self.sender.cc.history
+        return res
+
+
+def parse_int_list(text):
+    # "3,7,12" -> [3, 7, 12]
+    return [int(x) for x in text.split(",") if x.strip()] if text else []
+
+
+def parse_float_list(text):
+    # "0.01,0.3" -> [0.01, 0.3]
+    return [float(x) for x in text.split(",") if x.strip()] if text else None
+
+
+def add_model_args(parser):
+    # channel model flags, shared with the other command line tools
+    parser.add_argument("--loss", type=float, default=0.0, help="random loss probability")
+    parser.add_argument("--burst", type=parse_float_list, default=None,
+                        help="Gilbert-Elliott burst loss: p_good_bad,p_bad_good[,loss_good,loss_bad]")
+    parser.add_argument("--jitter", type=parse_int_list, default=None, help="uniform extra delay: low,high")
+    parser.add_argument("--normal-jitter", type=float, default=0.0, help="std dev of normal delay jitter")
+    parser.add_argument("--reorder", type=parse_float_list, default=None, help="reordering: probability,gap")
+    parser.add_argument("--duplicate", type=float, default=0.0, help="duplication probability")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="probability of a flipped bit")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def add_link_args(parser):
+    # bottleneck link flags, shared with multiplex.py
+    parser.add_argument("--bandwidth", type=float, default=None,
+                        help="bottleneck bandwidth in bytes per tick (default: unlimited)")
+    parser.add_argument("--queue", choices=sorted(QUEUES), default="droptail", help="bottleneck queue discipline")
+    parser.add_argument("--queue-limit", type=int, default=DEFAULT_LIMIT, help="queue size in packets")
+    parser.add_argument("--codel-target", type=float, default=5, help="CoDel: acceptable queueing delay (ticks)")
+    parser.add_argument("--codel-interval", type=float, default=100, help="CoDel: about one RTT (ticks)")
+
+
+def link_from_args(args):
+    # keyword arguments for Simulation / MultiFlowSimulation
+    options = None
+    if args.queue == "codel":
+        options = {"target": args.codel_target, "interval": args.codel_interval}
+    return dict(bandwidth=args.bandwidth, queue=args.queue, queue_limit=args.queue_limit, queue_options=options)
+
+
+def add_trace_args(parser):
+    parser.add_argument("--trace", default=None,
+                        help="record events and write them here (.ndjson/.jsonl for NDJSON, otherwise binary)")
+    parser.add_argument("--trace-capacity", type=int, default=TRACE_CAPACITY,
+                        help="keep only the last N events")
+
+
+def save_trace(tracer, path):
+    if path.endswith((".ndjson", ".jsonl")):
+        tracer.dump_ndjson(path)
+    else:
+        tracer.dump_binary(path)
+
+
+def models_from_args(args):
+    return build_models(loss=args.loss, burst=args.burst, jitter=args.jitter,
+                        normal_jitter=args.normal_jitter, reorder=args.reorder,
+                        duplicate=args.duplicate, corrupt=args.corrupt, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the TCP-like protocol without the UI.")
+    parser.add_argument("--window", type=int, default=4)
+    parser.add_argument("--timeout", type=int, default=120)
+    parser.add_argument("--packets", type=int, default=10)
+    parser.add_argument("--delay", type=int, default=60)
+    parser.add_argument("--loss-data", default="", help="comma separated seq numbers to drop")
+    parser.add_argument("--loss-ack", default="", help="comma separated ack numbers to drop")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--sack", action="store_true", help="selective ACKs: resend every hole at once")
+    parser.add_argument("--cc", choices=["none", "reno", "cubic"], default="none",
+                        help="congestion control (--window becomes the upper limit)")
+    parser.add_argument("--cc-trace", default=None, help="write the cwnd/ssthresh time series to this CSV")
+    parser.add_argument("--adaptive-rto", action="store_true",
+                        help="estimate the timeout from RTT samples (--timeout is the starting value). "
+                             "timeouts back off to at most 4x the current estimate")
+    parser.add_argument("--checksum", choices=["none", "inet", "crc32c"], default="none",
+                        help="checksum segments and drop the ones that don't verify")
+    parser.add_argument("--rwnd", type=int, default=None,
+                        help="receive buffer in segments (default: same as --window)")
+    parser.add_argument("--read-rate", type=float, default=None,
+                        help="segments per tick the receiving app reads (default: instantly)")
+    parser.add_argument("--delayed-ack", type=int, default=None, metavar="TICKS",
+                        help="delay in-order ACKs up to TICKS (ACK every --ack-every segments)")
+    parser.add_argument("--ack-every", type=int, default=2)
+    parser.add_argument("--file", default=None, help="send this file instead of --packets dummy messages")
+    parser.add_argument("--out", default=None, help="file mode: where the receiver writes the file")
+    parser.add_argument("--mss", type=int, default=MSS,
+                        help="payload bytes per segment (file mode, or with --bandwidth)")
+    add_link_args(parser)
+    add_model_args(parser)
+    add_trace_args(parser)
+    args = parser.parse_args(argv)
+    if args.file and not args.out:
+        parser.error("--file needs --out")
+    tracer = Tracer(args.trace_capacity) if args.trace else None
+
+    source = map_file(args.file) if args.file else None
+    sink = FileSink(args.out, args.mss) if args.file else None
+    sim = Simulation(args.window, args.timeout, args.packets, args.delay,
+                     parse_int_list(args.loss_data), parse_int_list(args.loss_ack),
+                     max_ticks=args.max_ticks, models=models_from_args(args), sack=args.sack,
+                     adaptive_rto=args.adaptive_rto, cc=args.cc, checksum=args.checksum,
+                     source=source, sink=sink, mss=args.mss, rwnd=args.rwnd, read_rate=args.read_rate,
+                     delayed_ack=args.delayed_ack, ack_every=args.ack_every, seed=args.seed,
+                     tracer=tracer, **link_from_args(args))
+    if args.bandwidth:
+        # how many segments it takes to keep the link busy for a round trip
+        bdp = sim.channel.link.bdp(2 * args.delay, HEADER_SIZE + args.mss)
+        print(f"{'bdp':>16}: {bdp:.1f} packets (window {args.window})")
+    try:
+        res = sim.run()
+    finally:
+        if sink is not None:
+            sink.close()
+            sim.sender.close()
+    if tracer is not None:
+        save_trace(tracer, args.trace)
+    if args.cc_trace:
+        with open(args.cc_trace, "w") as f:
+            f.write("tick,cwnd,ssthresh\n")
+            for tick, cwnd, ssthresh in res.cc_history:
+                f.write(f"{tick},{cwnd},{ssthresh}\n")
+    for key, value in res.as_dict().items():
+        print(f"{key:>16}: {value}")
+    return res
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Parameter sweep runner. Runs a headless simulation for every
+combination of window / timeout / delay / loss, spread over a process
+pool, and streams the results to a CSV file as they finish. Re-running
+the same command skips the combinations already in the file, so an
+interrupted sweep picks up where it left off.
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from channel_models import build_models
+from simulation import Simulation
+
+# the columns that identify one run (used to skip finished ones on resume)
+KEY_FIELDS = ["window", "timeout", "delay", "loss", "seed"]
+RESULT_FIELDS = ["ticks", "packets", "retransmits", "timeouts", "dup_acks",
+                 "receiver_dups", "dropped", "goodput", "wall_time", "completed"]
+
+
+def parse_range(text, cast=int):
+    # "4,8,16" -> [4, 8, 16]   and   "4:16:4" -> [4, 8, 12, 16] (stop included)
+    values = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            pieces = [cast(x) for x in part.split(":")]
+            start, stop = pieces[0], pieces[1]
+            step = pieces[2] if len(pieces) > 2 else cast(1)
+            if step <= 0:
+                raise argparse.ArgumentTypeError(f"step must be positive in {part!r}")
+            v = start
+            # tiny slack so float ranges like 0:0.1:0.02 still include the stop
+            while v <= stop + step * 1e-9:
+                values.append(round(v, 10) if cast is float else v)
+                v += step
+        else:
+            values.append(cast(part))
+    return values
+
+
+def make_jobs(windows, timeouts, delays, losses, seeds):
+    for window, timeout, delay, loss, seed in itertools.product(windows, timeouts, delays, losses, seeds):
+        yield {"window": window, "timeout": timeout, "delay": delay, "loss": loss, "seed": seed}
+
+
+def job_key(row):
+    # rows read back from the CSV are strings, so normalise everything
+    return (int(row["window"]), int(row["timeout"]), int(row["delay"]),
+            float(row["loss"]), int(row["seed"]))
+
+
+def check_result(row):
+    # raises if the result half of a row is missing or garbled, i.e. the
+    # sweep got killed partway through writing it
+    for name in RESULT_FIELDS:
+        value = row.get(name)
+        if name == "completed":
+            if value not in ("True", "False"):
+                raise ValueError(f"bad {name}: {value!r}")
+        elif name in ("goodput", "wall_time"):
+            float(value)
+        else:
+            int(value)
+
+
+def run_job(job, packets, max_ticks):
+    # runs in a worker process
+    models = build_models(loss=job["loss"], seed=job["seed"])
+    sim = Simulation(job["window"], job["timeout"], packets, job["delay"],
+                     max_ticks=max_ticks, models=models)
+    row = dict(job)
+    row.update(sim.run().as_dict())
+    return row
+
+
+def load_done(path):
+    # keys of the runs already in the output file
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    done = set()
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                check_result(row)
+                done.add(job_key(row))
+            except (TypeError, ValueError):
+                # half written row from a killed sweep, just run it again
+                continue
+    return done
+
+
+def trim_partial_line(path):
+    # if the last sweep got killed mid-write the file can end in half a row.
+    # cut it off so the rows we append next start on a clean line.
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def run_sweep(jobs, out_path, packets, max_ticks=None, workers=None, progress=True):
+    # trim first, so a half written last row doesn't count as done
+    trim_partial_line(out_path)
+    done = load_done(out_path)
+    todo = [job for job in jobs if job_key(job) not in done]
+    if progress:
+        print(f"{len(done)} runs already in {out_path}, {len(todo)} to go")
+    if not todo:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    new_file = not os.path.exists(out_path) or os.path.getsize(out_path) == 0
+    finished = 0
+
+    with open(out_path, "a", newline="") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=KEY_FIELDS + RESULT_FIELDS, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+
+        # keep a few jobs queued per worker instead of submitting everything
+        # at once, so huge sweeps don't build a giant backlog of futures
+        pending = set()
+        queue = iter(todo)
+        try:
+            for job in itertools.islice(queue, workers * 4):
+                pending.add(pool.submit(run_job, job, packets, max_ticks))
+            while pending:
+                complete, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in complete:
+                    writer.writerow(fut.result())
+                    finished += 1
+                    nxt = next(queue, None)
+                    if nxt is not None:
+                        pending.add(pool.submit(run_job, nxt, packets, max_ticks))
+                # flush after every batch so an interrupted sweep keeps its rows
+                f.flush()
+                if progress:
+                    print(f"\r{finished}/{len(todo)} runs", end="", file=sys.stderr)
+        except KeyboardInterrupt:
+            for fut in pending:
+                fut.cancel()
+            print(f"\ninterrupted after {finished} runs, run again to resume", file=sys.stderr)
+            raise
+    if progress:
+        print(file=sys.stderr)
+    return finished
+
+
+def csv_to_parquet(csv_path, parquet_path):
+    # parquet is optional, it needs pyarrow
+    try:
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("writing parquet needs pyarrow (pip install pyarrow)")
+    pq.write_table(pa_csv.read_csv(csv_path), parquet_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep simulation parameters over a process pool.")
+    parser.add_argument("--window", type=parse_range, default=[4], help="e.g. 4,8,16 or 4:64:4")
+    parser.add_argument("--timeout", type=parse_range, default=[120])
+    parser.add_argument("--delay", type=parse_range, default=[60])
+    parser.add_argument("--loss", type=lambda s: parse_range(s, float), default=[0.0])
+    parser.add_argument("--seeds", type=parse_range, default=[0], help="one run per seed")
+    parser.add_argument("--packets", type=int, default=1000)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of cores")
+    parser.add_argument("--out", default="sweep.csv", help="CSV file, appended to and resumed from")
+    parser.add_argument("--parquet", default=None, help="also write the finished results to this parquet file")
+    args = parser.parse_args(argv)
+
+    jobs = make_jobs(args.window, args.timeout, args.delay, args.loss, args.seeds)
+    try:
+        run_sweep(jobs, args.out, args.packets, args.max_ticks, args.workers)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    if args.parquet:
+        csv_to_parquet(args.out, args.parquet)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,12 @@ Description: Main UI file (using Pygame)
 """
 
 import pygame
+import math
+import queue
 import sys
-from channel import Channel
-from sender import Sender
-from receiver import Receiver
+import time
+from collections import deque
+from sim_worker import SimWorker, SEND_NEW, AUTO, PAUSE, KILL, SPEED, SAVE
 
 # -------------------------------------------------
 # Global constants & colors
@@ -17,6 +19,37 @@ from receiver import Receiver
 screenWidth = 1200
 screenHeight = 800
 
+# rendering runs at a fixed frame rate, the simulation runs in its own
+# thread (sim_worker.py) at sim_speed ticks per second
+FPS = 60
+SPEEDS = [1, 2, 5, 10, 15, 30, 60, 120, 250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000]
+DEFAULT_SPEED = 15
+
+# screen regions that get redrawn on their own when what they show changes
+SENDER_RECT = pygame.Rect(0, 40, 750, 90)
+RECEIVER_RECT = pygame.Rect(0, 525, 750, 75)
+LOG_RECT = pygame.Rect(752, 55, 448, 685)
+STATUS_RECT = pygame.Rect(150, 640, 600, 24)
+VIEW_RECT = pygame.Rect(0, 132, 750, 24)
+
+# the sender/receiver rows are a window onto sequence space: VIEW_W pixels
+# starting at seq view_start, seq_px pixels per seq. only what's inside
+# gets drawn, and once a seq is narrower than LOD_PX the rows switch to
+# density bars BAR_PX wide, so drawing costs the same for 10 packets or
+# a million.
+VIEW_X = 50
+VIEW_W = 680
+SLOT_PX = 45            # px per seq at the default zoom (40px box + gap)
+MAX_SEQ_PX = 90
+LOD_PX = 6
+BAR_PX = 2
+BOX_H = 30
+MAX_PACKETS = 1000000
+MENU_BOXES = 20         # loss config boxes shown in the menu
+RECORDING_PATH = "recording.json"   # where S saves the run, see replay.py
+
+TEXT_CACHE_SIZE = 4096
+
 # colors
 white = (255, 255, 255)
 black = (0, 0, 0)
@@ -33,6 +66,23 @@ darkGray = (100, 100, 100)
 # UI helper classes
 # -------------------------------------------------
 
+_text_cache = {}
+
+def overlap(a, b, lo, hi):
+    # length of [a, b) that falls inside [lo, hi)
+    return max(0.0, min(b, hi) - max(a, lo))
+
+def render_text(font, text, color):
+    # font.render is slow and the same labels get drawn every frame, so the
+    # surfaces are kept around keyed by (font, text, color)
+    key = (font, text, color)
+    surf = _text_cache.get(key)
+    if surf is None:
+        if len(_text_cache) >= TEXT_CACHE_SIZE:
+            _text_cache.clear()
+        surf = _text_cache[key] = font.render(text, True, color)
+    return surf
+
 class InputBox:
     def __init__(self, x, y, w, h, text='', label=''):
         self.rect = pygame.Rect(x, y, w, h)
@@ -40,6 +90,7 @@ class InputBox:
         self.text = text
         self.label = label
         self.font = pygame.font.SysFont("Arial", 18)
+        self.label_font = pygame.font.SysFont("Arial", 16)
         self.txt_surface = self.font.render(text, True, self.color)
         self.active = False
 
@@ -70,7 +121,7 @@ class InputBox:
 
     def draw(self, screen):
         # put the label a bit above the box
-        label_surf = pygame.font.SysFont("Arial", 16).render(self.label, True, darkGray)
+        label_surf = render_text(self.label_font, self.label, darkGray)
         screen.blit(label_surf, (self.rect.x, self.rect.y - 20))
         
         pygame.draw.rect(screen, self.color, self.rect, 2)
@@ -108,7 +159,7 @@ class Button:
         pygame.draw.rect(screen, self.color, draw_rect)
         pygame.draw.rect(screen, black, draw_rect, 2)
         
-        text_surf = self.font.render(self.text, True, black)
+        text_surf = render_text(self.font, self.text, black)
         text_rect = text_surf.get_rect(center=draw_rect.center)
         screen.blit(text_surf, text_rect)
 
@@ -126,10 +177,24 @@ class NetworkSim:
         self.title_font = pygame.font.SysFont("Arial", 22, bold=True)
         
         self.state = 'MENU'
-        self.channel = None
-        self.sender = None
-        self.receiver = None
+        # the simulation runs in self.sim's thread. everything drawn comes
+        # from self.snap, the latest snapshot it published.
+        self.sim = None
+        self.snap = None
         self.logs = [] 
+        self.log_version = 0    # bumped on every new log line so the panel knows to redraw
+        
+        # rendering state: the static background, the layer with the panels
+        # on it (None = rebuild everything next frame) and what each panel
+        # showed when it was last drawn
+        self.background = None
+        self.layer = None
+        self.panel_state = {}
+        self.packet_rects = []
+        self.button_state = {}
+        self.frame_times = deque(maxlen=FPS)
+        self.frame_report = 0.0
+        self.frame_text = ""
         
         self.clickable_packets = [] 
         self.selected_packet = None 
@@ -142,7 +207,7 @@ class NetworkSim:
         # default inputs
         self.inputs = [
             InputBox(100, 260, 100, 32, text='4', label='Window (N)'),
-            InputBox(250, 260, 100, 32, text='10', label='Total Pkts (Max 15)'),
+            InputBox(250, 260, 100, 32, text='10', label='Total Pkts'),
             InputBox(400, 260, 100, 32, text='120', label='Timeout (Ticks)'),
             InputBox(550, 260, 100, 32, text='60', label='Prop. Delay'),
         ]
@@ -157,30 +222,39 @@ class NetworkSim:
         self.reset_btn    = Button(460, 680, 80, 40, "RESET", lightGray, 'RESET')
         self.slower_btn   = Button(560, 680, 80, 40, "SLOWER", lightGray, 'SLOWER')
         self.faster_btn   = Button(660, 680, 80, 40, "FASTER", lightGray, 'FASTER')
+        self.auto_btn     = Button(20, 630, 120, 36, "AUTO: OFF", lightGray, 'TOGGLE_AUTO')
         
         self.sim_buttons = [self.send_new_btn, self.pause_btn, self.kill_btn, 
-                            self.reset_btn, self.slower_btn, self.faster_btn]
+                            self.reset_btn, self.slower_btn, self.faster_btn,
+                            self.auto_btn]
         
         self.paused = False
         # start slow so the user can see what's happening
-        self.sim_speed = 15 
+        self.sim_speed = DEFAULT_SPEED  # ticks per second
+
+        # sequence space viewport (see VIEW_X). follow keeps the send window
+        # in view until the user scrolls away.
+        self.view_start = 0.0
+        self.seq_px = float(SLOT_PX)
+        self.follow = True
 
     def add_log(self, text, color=black):
         # keeps the on-screen log from getting too long
         self.logs.append((text, color))
         if len(self.logs) > 28: 
             self.logs.pop(0)
+        self.log_version += 1
             
         # Print to terminal:
         print(text)
 
     def validate_config(self):
-        # 1. Cap total packets at 15 to fit on screen
+        # 1. Cap total packets (the view scrolls, so this is just a sanity limit)
         total = self.inputs[1].get_value()
         
-        if total > 15:
-            total = 15
-            self.inputs[1].set_value(15)
+        if total > MAX_PACKETS:
+            total = MAX_PACKETS
+            self.inputs[1].set_value(MAX_PACKETS)
             
         # if the box is empty (0), use 1 for visuals so we don't crash
         visual_total = total
@@ -218,19 +292,96 @@ class NetworkSim:
         loss_data_list = list(self.config_loss_data)
         loss_ack_list = list(self.config_loss_ack)
 
-        # initialize the backend logic
-        self.channel = Channel(loss_data_list, loss_ack_list, delay, log_callback=self.add_log)
-        self.sender = Sender(self.channel, win_size, timeout, total_pkts, log_callback=self.add_log)
-        self.receiver = Receiver(self.channel, log_callback=self.add_log)
-        
-        # link them up
-        self.sender.set_receiver_ref(self.receiver)
-        self.receiver.set_sender_ref(self.sender)
+        # initialize the backend logic, it runs on its own from here
+        self.stop_simulation()
+        self.sim = SimWorker(win_size, timeout, total_pkts, delay, loss_data_list, loss_ack_list, self.sim_speed)
+        self.snap = self.sim.snapshot
         
         self.logs = [] 
+        self.log_version += 1
+        self.layer = None
         self.selected_packet = None
         self.state = 'SIMULATION'
         self.paused = False
+        self.view_start = 0.0
+        self.seq_px = float(SLOT_PX)
+        self.follow = True
+        self.clamp_view()
+        self.sim.start()
+
+    def stop_simulation(self):
+        if self.sim is not None:
+            self.sim.stop()
+            self.sim = None
+
+    def sync_simulation(self):
+        # pick up what the worker has done since the last frame
+        logs = self.sim.logs
+        while True:
+            try:
+                text, color = logs.get_nowait()
+            except queue.Empty:
+                break
+            self.add_log(text, color)
+        self.snap = self.sim.snapshot
+        if self.snap.done:
+            self.paused = True
+
+    # -------------------------------------------------
+    # Sequence space viewport
+    # -------------------------------------------------
+
+    def seq_x(self, seq):
+        return VIEW_X + (seq - self.view_start) * self.seq_px
+
+    def box_width(self):
+        # a box with a gap after it while they're big enough, solid bars after that
+        if self.seq_px >= LOD_PX:
+            return max(1, int(self.seq_px * 40 / SLOT_PX))
+        return max(1, int(self.seq_px))
+
+    def visible_seqs(self):
+        # (first, last) seqs at least partly on screen, last exclusive
+        first = max(0, int(self.view_start))
+        last = min(self.snap.totalPackets, math.ceil(self.view_start + VIEW_W / self.seq_px))
+        return first, max(first, last)
+
+    def clamp_view(self):
+        total = max(1, self.snap.totalPackets)
+        # zoomed all the way out the whole transfer fits
+        min_px = min(SLOT_PX, VIEW_W / total)
+        self.seq_px = min(MAX_SEQ_PX, max(min_px, self.seq_px))
+        span = VIEW_W / self.seq_px
+        self.view_start = min(max(0.0, self.view_start), max(0.0, total - span))
+
+    def zoom_view(self, factor, anchor_x=VIEW_X + VIEW_W // 2):
+        # keep the seq under anchor_x where it is
+        offset = (anchor_x - VIEW_X) / self.seq_px
+        anchor = self.view_start + offset
+        self.seq_px *= factor
+        self.clamp_view()
+        self.view_start = anchor - (anchor_x - VIEW_X) / self.seq_px
+        self.clamp_view()
+
+    def pan_view(self, pixels):
+        self.view_start += pixels / self.seq_px
+        self.follow = False
+        self.clamp_view()
+
+    def fit_view(self):
+        self.seq_px = 0.0
+        self.view_start = 0.0
+        self.follow = False
+        self.clamp_view()
+
+    def follow_window(self):
+        # scroll so the window (base up to nextSeqNum) is on screen
+        span = VIEW_W / self.seq_px
+        base = self.snap.base
+        end = max(base + 1, self.snap.nextSeqNum)
+        if base < self.view_start or end > self.view_start + span:
+            self.view_start = base - span / 10
+            self.clamp_view()
 
     def handle_menu_events(self, event):
         for box in self.inputs:
@@ -259,27 +410,50 @@ class NetworkSim:
                             self.config_loss_ack.add(idx)
 
     def handle_sim_events(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
+        # viewport: wheel zooms around the mouse, shift+wheel / arrows scroll
+        if event.type == pygame.MOUSEWHEEL:
+            mx, _ = pygame.mouse.get_pos()
+            if mx < SENDER_RECT.right:
+                if event.x:
+                    self.pan_view(event.x * 40)
+                elif pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                    self.pan_view(-event.y * 40)
+                else:
+                    self.zoom_view(1.25 ** event.y, min(max(mx, VIEW_X), VIEW_X + VIEW_W))
+
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_LEFT: self.pan_view(-VIEW_W / 4)
+            if event.key == pygame.K_RIGHT: self.pan_view(VIEW_W / 4)
+            if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS): self.zoom_view(2)
+            if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS): self.zoom_view(0.5)
+            if event.key == pygame.K_HOME: self.fit_view()
+            if event.key == pygame.K_f: self.follow = not self.follow
+            if event.key == pygame.K_s: self.sim.send(SAVE, RECORDING_PATH)
+
+        # buttons 4/5 are the wheel again, already handled above
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button not in (4, 5):
             for btn in self.sim_buttons:
                 if btn.is_clicked(event.pos):
                     if btn.action_code == 'SEND_NEW':
                         # only allow sending if window isn't full (button not gray)
                         if self.send_new_btn.color != gray:
-                            success = self.sender.attempt_send_one()
-                            if not success: self.add_log("Window Full!", orange)
+                            self.sim.send(SEND_NEW)
                     
+                    if btn.action_code == 'TOGGLE_AUTO':
+                        # auto-send keeps the window full by itself
+                        self.sim.send(AUTO, not self.snap.autoSend)
+
                     if btn.action_code == 'TOGGLE_PAUSE': 
                         self.paused = not self.paused
                         self.selected_packet = None
+                        self.sim.send(PAUSE, self.paused)
                     
                     if btn.action_code == 'KILL':
                         # logic to remove a packet mid-flight
                         if self.paused and self.selected_packet:
-                            success = self.channel.kill_specific_packet(self.selected_packet)
-                            if success:
-                                name = f"ACK {self.selected_packet.ackNum}" if self.selected_packet.isAck else f"Data {self.selected_packet.seqNum}"
-                                self.add_log(f"KILLED {name} (User Click)", red)
-                                self.selected_packet = None
+                            # the worker logs it if the packet was still out there
+                            self.sim.send(KILL, self.selected_packet)
+                            self.selected_packet = None
                         elif not self.paused:
                             self.add_log("Must PAUSE to kill!", orange)
                         else:
@@ -287,10 +461,13 @@ class NetworkSim:
 
                     if btn.action_code == 'RESET': 
                         print("\n--- SIMULATION RESET ---\n")
+                        self.stop_simulation()
                         self.state = 'MENU'
+                        return
                         
-                    if btn.action_code == 'FASTER': self.sim_speed = min(120, self.sim_speed + 5)
-                    if btn.action_code == 'SLOWER': self.sim_speed = max(5, self.sim_speed - 5)
+                    if btn.action_code == 'FASTER': self.sim_speed = next((s for s in SPEEDS if s > self.sim_speed), SPEEDS[-1])
+                    if btn.action_code == 'SLOWER': self.sim_speed = next((s for s in reversed(SPEEDS) if s < self.sim_speed), SPEEDS[0])
+                    if btn.action_code in ('FASTER', 'SLOWER'): self.sim.send(SPEED, self.sim_speed)
 
             # selecting a packet on screen (turns green)
             if self.paused:
@@ -312,7 +489,7 @@ class NetworkSim:
         self.screen.fill(white)
         
         # header area
-        title = self.title_font.render("TCP-Like Protocol Configuration", True, black)
+        title = render_text(self.title_font, "TCP-Like Protocol Configuration", black)
         self.screen.blit(title, (screenWidth//2 - 160, 30))
         
         instr_lines = [
@@ -321,12 +498,12 @@ class NetworkSim:
             "2. VISUAL CONFIG: Click the boxes below to simulate automatic loss.",
             "   - Clicking a Sender Box (Top) drops that DATA packet.",
             "   - Clicking a Receiver Box (Bottom) drops that ACK packet.",
-            "3. Press START. In simulation, use 'SEND NEW' to transmit packets.",
+            "3. Press START. In simulation, use 'SEND NEW' to transmit packets (or 'AUTO' to keep the window full).",
             "4. Pause & Click moving packets to kill them manually."
         ]
         y_txt = 70
         for line in instr_lines:
-            txt = self.font.render(line, True, darkGray)
+            txt = render_text(self.font, line, darkGray)
             self.screen.blit(txt, (100, y_txt))
             y_txt += 22
 
@@ -336,27 +513,32 @@ class NetworkSim:
         
         self.start_btn.draw(self.screen)
 
-        # visual grid for loss config
+        # visual grid for loss config. only the first MENU_BOXES packets
+        # fit on screen, the rest of the transfer has no scripted losses
         win_size, total_pkts = self.validate_config()
+        shown = min(total_pkts, MENU_BOXES)
+        if total_pkts > shown:
+            more = render_text(self.font, f"(showing packets 0-{shown - 1} of {total_pkts:,})", darkGray)
+            self.screen.blit(more, (100, 610))
         
         # 1. Sender row (Data Loss)
         y_start = 380
-        lbl = self.title_font.render("SENDER PACKETS (DATA LOSS):", True, blue)
+        lbl = render_text(self.title_font, "SENDER PACKETS (DATA LOSS):", blue)
         self.screen.blit(lbl, (100, y_start - 30))
         
         # text summary of what is selected
         if self.config_loss_data:
             loss_str = ", ".join(str(x) for x in sorted(self.config_loss_data))
-            txt_loss = self.font.render(f"Loss Data Packets: {loss_str}", True, red)
+            txt_loss = render_text(self.font, f"Loss Data Packets: {loss_str}", red)
         else:
-            txt_loss = self.font.render("Loss Data Packets: None", True, darkGray)
+            txt_loss = render_text(self.font, "Loss Data Packets: None", darkGray)
         self.screen.blit(txt_loss, (500, y_start - 30))
 
         self.menu_box_rects = []
         
         start_x = 100
         box_w = 40
-        for i in range(total_pkts):
+        for i in range(shown):
             x = start_x + (i * 50)
             rect = pygame.Rect(x, y_start, box_w, 40)
             is_lost = i in self.config_loss_data
@@ -365,7 +547,7 @@ class NetworkSim:
             pygame.draw.rect(self.screen, color, rect)
             pygame.draw.rect(self.screen, black, rect, 2)
             
-            num = self.font.render(str(i), True, black)
+            num = render_text(self.font, str(i), black)
             self.screen.blit(num, (x+12, y_start+10))
             
             # preview window brackets for clarity
@@ -387,17 +569,17 @@ class NetworkSim:
 
         # 2. Receiver row (ACK Loss)
         y_start = 550
-        lbl = self.title_font.render("RECEIVER PACKETS (ACK LOSS):", True, red)
+        lbl = render_text(self.title_font, "RECEIVER PACKETS (ACK LOSS):", red)
         self.screen.blit(lbl, (100, y_start - 30))
         
         if self.config_loss_ack:
             loss_str = ", ".join(str(x) for x in sorted(self.config_loss_ack))
-            txt_loss = self.font.render(f"Loss ACK Packets: {loss_str}", True, red)
+            txt_loss = render_text(self.font, f"Loss ACK Packets: {loss_str}", red)
         else:
-            txt_loss = self.font.render("Loss ACK Packets: None", True, darkGray)
+            txt_loss = render_text(self.font, "Loss ACK Packets: None", darkGray)
         self.screen.blit(txt_loss, (500, y_start - 30))
         
-        for i in range(total_pkts):
+        for i in range(shown):
             x = start_x + (i * 50)
             rect = pygame.Rect(x, y_start, box_w, 40)
             is_lost = i in self.config_loss_ack
@@ -406,7 +588,7 @@ class NetworkSim:
             pygame.draw.rect(self.screen, color, rect)
             pygame.draw.rect(self.screen, black, rect, 2)
             
-            num = self.font.render(str(i), True, black)
+            num = render_text(self.font, str(i), black)
             self.screen.blit(num, (x+12, y_start+10))
             
             if is_lost:
@@ -415,7 +597,7 @@ class NetworkSim:
 
             self.menu_box_rects.append((rect, i, 'ACK'))
 
-    def draw_legend(self):
+    def draw_legend(self, surface):
         y = 740
         legend_items = [
             ("Sent (Flight)", blue),
@@ -426,20 +608,195 @@ class NetworkSim:
         ]
         
         x = 20
-        lbl = self.font.render("LEGEND: ", True, black)
-        self.screen.blit(lbl, (x, y))
+        lbl = render_text(self.font, "LEGEND: ", black)
+        surface.blit(lbl, (x, y))
         x += 80
         
         for text, color in legend_items:
-            pygame.draw.rect(self.screen, color, (x, y, 20, 20))
-            pygame.draw.rect(self.screen, black, (x, y, 20, 20), 1)
-            txt_surf = self.font.render(text, True, black)
-            self.screen.blit(txt_surf, (x + 25, y))
+            pygame.draw.rect(surface, color, (x, y, 20, 20))
+            pygame.draw.rect(surface, black, (x, y, 20, 20), 1)
+            txt_surf = render_text(self.font, text, black)
+            surface.blit(txt_surf, (x + 25, y))
             x += 140
 
+    def build_background(self):
+        # everything that doesn't change during a run: dividers, titles,
+        # the log panel and the legend. drawn once per simulation.
+        bg = pygame.Surface((screenWidth, screenHeight))
+        bg.fill(white)
+        pygame.draw.line(bg, black, (0, 160), (750, 160), 1)
+        lbl = render_text(self.title_font, f"SENDER (Window N={self.snap.windowSize})", blue)
+        bg.blit(lbl, (20, 20))
+        pygame.draw.line(bg, black, (0, 450), (750, 450), 1)
+        lbl = render_text(self.title_font, "RECEIVER", red)
+        bg.blit(lbl, (20, 500))
+
+        panel_x = LOG_RECT.x
+        pygame.draw.rect(bg, lightGray, (panel_x, 0, screenWidth-panel_x, screenHeight))
+        pygame.draw.line(bg, black, (panel_x, 0), (panel_x, screenHeight), 2)
+        log_title = render_text(self.title_font, "EVENT LOG", black)
+        bg.blit(log_title, (panel_x + 80, 20))
+
+        self.draw_legend(bg)
+        return bg
+
+    def draw_bracket(self, surface, x, y, left):
+        # one side of the window bracket, opening towards the window
+        tick = 10 if left else -10
+        pygame.draw.line(surface, black, (x, y-10), (x, y+40), 3)
+        pygame.draw.line(surface, black, (x, y-10), (x+tick, y-10), 3)
+        pygame.draw.line(surface, black, (x, y+40), (x+tick, y+40), 3)
+
+    def draw_boxes(self, surface, y, color_of):
+        # one box per visible seq, numbered if the number fits
+        first, last = self.visible_seqs()
+        box_w = self.box_width()
+        for i in range(first, last):
+            x = self.seq_x(i)
+            pygame.draw.rect(surface, color_of(i), (x, y, box_w, BOX_H))
+            pygame.draw.rect(surface, black, (x, y, box_w, BOX_H), 1)
+            num = render_text(self.font, str(i), black)
+            if num.get_width() + 4 <= box_w:
+                surface.blit(num, (x + (box_w - num.get_width()) // 2, y+5))
+
+    def draw_density(self, surface, y, ranges, cover=None, cover_color=None):
+        # level of detail for when seqs are narrower than LOD_PX. every
+        # BAR_PX wide column is a stacked bar of how much of its seqs fall in
+        # each (lo, hi, color) range, plus cover[column] (seqs' worth) on top.
+        # runs of identical columns are drawn as one rect.
+        total = self.snap.totalPackets
+        width = int(min(VIEW_W, (total - self.view_start) * self.seq_px))
+        span = BAR_PX / self.seq_px
+        colors = [color for _, _, color in ranges]
+        if cover is not None:
+            colors.append(cover_color)
+        columns = []
+        for c in range(0, width, BAR_PX):
+            a = self.view_start + c / self.seq_px
+            b = min(total, a + span)
+            n = b - a
+            parts = [overlap(a, b, lo, hi) / n for lo, hi, _ in ranges]
+            if cover is not None:
+                parts.append(min(1.0, cover.get(c // BAR_PX, 0.0) / n))
+            # anything there at all gets a couple of pixels so it doesn't vanish
+            columns.append([max(2, int(BOX_H * p + 0.5)) if p > 0 else 0 for p in parts])
+
+        pygame.draw.rect(surface, white, (VIEW_X, y, width, BOX_H))
+        i = 0
+        while i < len(columns):
+            j = i + 1
+            while j < len(columns) and columns[j] == columns[i]:
+                j += 1
+            x = VIEW_X + i * BAR_PX
+            w = min(j * BAR_PX, width) - i * BAR_PX
+            bottom = y + BOX_H
+            for h, color in zip(columns[i], colors):
+                h = min(h, bottom - y)
+                if h > 0:
+                    pygame.draw.rect(surface, color, (x, bottom - h, w, h))
+                    bottom -= h
+            i = j
+        pygame.draw.rect(surface, black, (VIEW_X, y, width, BOX_H), 1)
+
+    def column_cover(self, seqs):
+        # how much of each density column the given seqs fill, in seqs
+        cover = {}
+        first, last = self.visible_seqs()
+        for seq in seqs:
+            if seq < first or seq >= last:
+                continue
+            a = (seq - self.view_start) * self.seq_px
+            b = a + self.seq_px
+            for c in range(max(0, int(a)) // BAR_PX, int(math.ceil(b)) // BAR_PX + 1):
+                part = overlap(a, b, c * BAR_PX, (c + 1) * BAR_PX) / self.seq_px
+                if part:
+                    cover[c] = cover.get(c, 0.0) + part
+        return cover
+
+    def draw_sender_panel(self, surface):
+        snap = self.snap
+        status_text = f"Base: {snap.base} | NextSeq: {snap.nextSeqNum} | Timer: {snap.timerCount}/{snap.timeoutInterval}"
+        surface.blit(render_text(self.font, status_text, black), (20, 50))
+        
+        base = snap.base
+        nextSeq = snap.nextSeqNum
+        y = 80
+        if self.seq_px >= LOD_PX:
+            def color_of(i):
+                if i < base:
+                    return gray
+                elif i < nextSeq:
+                    return blue
+                return white
+            self.draw_boxes(surface, y, color_of)
+        else:
+            self.draw_density(surface, y, ((0, base, gray), (base, nextSeq, blue)))
+
+        # draw window brackets
+        first, last = self.visible_seqs()
+        if first <= base < last:
+            self.draw_bracket(surface, self.seq_x(base), y, True)
+        top = base + snap.windowSize - 1
+        if first <= top < last and top < snap.totalPackets:
+            self.draw_bracket(surface, self.seq_x(top) + self.box_width(), y, False)
+
+    def draw_receiver_panel(self, surface):
+        snap = self.snap
+        buf_list = snap.buffered
+        if len(buf_list) > 8:
+            buf_text = f"{len(buf_list)} segs ({buf_list[0]}-{buf_list[-1]})"
+        else:
+            buf_text = str(list(buf_list))
+        recv_status = f"Expected: {snap.expectedSeqNum} | Buffered: {buf_text} | rwnd: {snap.rwnd}"
+        surface.blit(render_text(self.font, recv_status, black), (20, 530))
+        
+        expected = snap.expectedSeqNum
+        buffer = set(buf_list)
+        y = 560
+        if self.seq_px >= LOD_PX:
+            def color_of(i):
+                if i < expected: return red
+                elif i in buffer: return orange
+                return white
+            self.draw_boxes(surface, y, color_of)
+            first, last = self.visible_seqs()
+            if first <= expected < last:
+                pygame.draw.rect(surface, black, (self.seq_x(expected), y, self.box_width(), BOX_H), 3)
+        else:
+            self.draw_density(surface, y, ((0, expected, red),), self.column_cover(buf_list), orange)
+            x = self.seq_x(expected)
+            if VIEW_X <= x <= VIEW_X + VIEW_W:
+                pygame.draw.line(surface, black, (x, y - 4), (x, y + BOX_H + 4), 3)
+
+    def draw_view_panel(self, surface):
+        first, last = self.visible_seqs()
+        follow = "ON" if self.follow else "OFF"
+        text = f"Seq {first:,}-{max(first, last - 1):,} of {self.snap.totalPackets:,} | {self.seq_px:.3g} px/seq | Follow: {follow}"
+        surface.blit(render_text(self.font, text, darkGray), (20, 135))
+        hint = render_text(self.font, "wheel: zoom, arrows: scroll, F: follow, Home: all", darkGray)
+        surface.blit(hint, (VIEW_RECT.right - hint.get_width() - 10, 135))
+
+    def draw_log_panel(self, surface):
+        y_off = 60
+        for text, color in self.logs:
+            surface.blit(render_text(self.font, text, color), (LOG_RECT.x + 10, y_off))
+            y_off += 25
+
+    def draw_status(self, surface):
+        spd_surf = render_text(self.font, f"Speed: {self.sim_speed} ticks/s", black)
+        surface.blit(spd_surf, (560, 645))
+        surface.blit(render_text(self.font, self.frame_text, darkGray), (160, 645))
+
     def draw_simulation(self):
-        self.screen.fill(white)
-        self.clickable_packets = [] 
+        # returns the screen rects that changed this frame (None = all of it)
+        full = self.layer is None
+        if full:
+            self.background = self.build_background()
+            self.layer = self.background.copy()
+            self.panel_state = {}
+            self.packet_rects = []
+            self.button_state = {}
+        dirty = []
         
         # --- Update buttons based on state ---
         if self.paused:
@@ -451,129 +808,115 @@ class NetworkSim:
             self.pause_btn.color = yellow
             self.kill_btn.color = gray 
 
+        snap = self.snap
+        if snap.autoSend:
+            self.auto_btn.text = "AUTO: ON"
+            self.auto_btn.color = green
+        else:
+            self.auto_btn.text = "AUTO: OFF"
+            self.auto_btn.color = lightGray
+
         # gray out sending if window is full
-        if self.sender.is_window_full():
+        if snap.windowFull:
             self.send_new_btn.color = gray
         else:
             self.send_new_btn.color = blue
 
-        # --- SENDER ---
-        pygame.draw.line(self.screen, black, (0, 160), (750, 160), 1)
-        lbl = self.title_font.render(f"SENDER (Window N={self.sender.windowSize})", True, blue)
-        self.screen.blit(lbl, (20, 20))
-        
-        status_text = f"Base: {self.sender.base} | NextSeq: {self.sender.nextSeqNum} | Timer: {self.sender.timerCount}/{self.sender.timeoutInterval}"
-        st_surf = self.font.render(status_text, True, black)
-        self.screen.blit(st_surf, (20, 50))
-        
-        start_x = 50
-        box_w = 40
-        for i in range(self.sender.totalPackets):
-            x = start_x + (i * 45)
-            y = 80
-            
-            # determine color
-            if i < self.sender.base:
-                color = gray 
-            elif i >= self.sender.base and i < self.sender.nextSeqNum:
-                color = blue
-            else:
-                color = white
-            
-            pygame.draw.rect(self.screen, color, (x, y, box_w, 30))
-            pygame.draw.rect(self.screen, black, (x, y, box_w, 30), 1)
-            txt = self.font.render(str(i), True, black)
-            self.screen.blit(txt, (x+12, y+5))
-            
-            # draw window brackets
-            if i == self.sender.base:
-                pygame.draw.line(self.screen, black, (x, y-10), (x, y+40), 3) 
-                pygame.draw.line(self.screen, black, (x, y-10), (x+10, y-10), 3)
-                pygame.draw.line(self.screen, black, (x, y+40), (x+10, y+40), 3)
-            if i == self.sender.base + self.sender.windowSize - 1:
-                pygame.draw.line(self.screen, black, (x+box_w, y-10), (x+box_w, y+40), 3) 
-                pygame.draw.line(self.screen, black, (x+box_w, y-10), (x+box_w-10, y-10), 3)
-                pygame.draw.line(self.screen, black, (x+box_w, y+40), (x+box_w-10, y+40), 3)
-
-        # --- RECEIVER ---
-        pygame.draw.line(self.screen, black, (0, 450), (750, 450), 1)
-        lbl = self.title_font.render("RECEIVER", True, red)
-        self.screen.blit(lbl, (20, 500))
-        
-        buf_list = list(self.receiver.buffer.keys())
-        recv_status = f"Expected: {self.receiver.expectedSeqNum} | Buffered: {buf_list}"
-        rst_surf = self.font.render(recv_status, True, black)
-        self.screen.blit(rst_surf, (20, 530))
-        
-        for i in range(self.sender.totalPackets):
-            x = start_x + (i * 45)
-            y = 560
-            color = white
-            if i < self.receiver.expectedSeqNum: color = red
-            elif i in self.receiver.buffer: color = orange
-            
-            pygame.draw.rect(self.screen, color, (x, y, box_w, 30))
-            pygame.draw.rect(self.screen, black, (x, y, box_w, 30), 1)
-            txt = self.font.render(str(i), True, black)
-            self.screen.blit(txt, (x+12, y+5))
-            
-            if i == self.receiver.expectedSeqNum:
-                pygame.draw.rect(self.screen, black, (x, y, box_w, 30), 3)
+        # --- PANELS ---
+        # each one is redrawn onto the layer only when what it shows changed
+        if self.follow:
+            self.follow_window()
+        view = (self.view_start, self.seq_px)
+        panels = (
+            ("sender", SENDER_RECT, (snap.base, snap.nextSeqNum, snap.timerCount,
+                                     snap.timeoutInterval, view), self.draw_sender_panel),
+            ("receiver", RECEIVER_RECT, (snap.expectedSeqNum, snap.buffered,
+                                         snap.readSeq, snap.rwnd, view), self.draw_receiver_panel),
+            ("view", VIEW_RECT, (view, self.follow), self.draw_view_panel),
+            ("log", LOG_RECT, self.log_version, self.draw_log_panel),
+            ("status", STATUS_RECT, (self.sim_speed, self.frame_text), self.draw_status),
+        )
+        layer = self.layer
+        for name, rect, state, draw in panels:
+            if self.panel_state.get(name) != state:
+                self.panel_state[name] = state
+                layer.set_clip(rect)
+                layer.blit(self.background, rect, rect)
+                draw(layer)
+                layer.set_clip(None)
+                dirty.append(rect)
 
         # --- CHANNEL ---
+        # packets go on top of the layer. the rects they covered last frame
+        # and cover now are dirty.
+        self.screen.blit(layer, (0, 0))
+        self.clickable_packets = [] 
+        box_w = self.box_width()
+        first, last = self.visible_seqs()
         transit_start_y = 110
         transit_end_y = 560
         
-        for item in self.channel.in_transit:
-            pkt, ticks, _, total = item
-            pct = 1.0 - (ticks / total)
+        # how far past the snapshot's tick the worker's clock should be by
+        # now, so packets move smoothly even when a tick takes several frames
+        frac = 0.0
+        if not snap.paused:
+            frac = min(1.0, (time.perf_counter() - snap.wall) * snap.speed)
+        packet_rects = []
+        for pkt, isAck, num, ticks, total in snap.packets:
+            # align rising ack with the packet that triggered it
+            slot = max(0, num - 1) if isAck else num
+            if slot < first or slot >= last:
+                continue    # off screen
+            pct = min(1.0, max(0.0, 1.0 - (ticks - frac) / total))
             
-            if pkt.isAck:
+            if isAck:
                 curr_y = transit_end_y - ((transit_end_y - transit_start_y) * pct)
                 color = yellow
-                # align rising ack with the packet that triggered it
-                visual_slot = max(0, pkt.ackNum - 1)
-                x_pos = start_x + (visual_slot * 45)
             else:
                 curr_y = transit_start_y + ((transit_end_y - transit_start_y) * pct)
                 color = blue
-                x_pos = start_x + (pkt.seqNum * 45)
+            x_pos = self.seq_x(slot)
             
             if self.selected_packet == pkt:
                 color = green
 
-            rect = pygame.Rect(x_pos, curr_y, box_w, 20)
+            rect = pygame.Rect(x_pos, curr_y, max(2, box_w), 20)
             pygame.draw.rect(self.screen, color, rect)
-            pygame.draw.rect(self.screen, black, rect, 1)
-            val = str(pkt.ackNum if pkt.isAck else pkt.seqNum)
-            self.screen.blit(self.font.render(val, True, black), (x_pos+12, curr_y))
+            if box_w >= 4:
+                pygame.draw.rect(self.screen, black, rect, 1)
+            label = render_text(self.font, str(num), black)
+            if label.get_width() + 4 <= box_w:
+                self.screen.blit(label, (x_pos + (box_w - label.get_width()) // 2, curr_y))
             
-            self.clickable_packets.append((rect, pkt))
-
-        # --- RIGHT SIDE: LOG ---
-        panel_x = 750
-        pygame.draw.rect(self.screen, lightGray, (panel_x, 0, screenWidth-panel_x, screenHeight))
-        pygame.draw.line(self.screen, black, (panel_x, 0), (panel_x, screenHeight), 2)
-        
-        log_title = self.title_font.render("EVENT LOG", True, black)
-        self.screen.blit(log_title, (panel_x + 80, 20))
-        
-        y_off = 60
-        for text, color in self.logs:
-            log_surf = self.font.render(text, True, color)
-            self.screen.blit(log_surf, (panel_x + 10, y_off))
-            y_off += 25
-
-        # --- FOOTER ---
-        self.draw_legend()
-        
-        # FPS display
-        spd_txt = f"Speed: {self.sim_speed} FPS"
-        spd_surf = self.font.render(spd_txt, True, black)
-        self.screen.blit(spd_surf, (560, 645))
-        
+            # thin packets are still easy enough to click
+            self.clickable_packets.append((rect.inflate(max(0, 8 - rect.w), 0), pkt))
+            packet_rects.append(rect)
+        if packet_rects or self.packet_rects:
+            dirty.extend(self.packet_rects)
+            dirty.extend(packet_rects)
+        self.packet_rects = packet_rects
+
+        # --- BUTTONS ---
+        mouse_pos = pygame.mouse.get_pos()
         for btn in self.sim_buttons:
             btn.draw(self.screen)
+            state = (btn.text, btn.color, btn.rect.collidepoint(mouse_pos))
+            if self.button_state.get(btn.action_code) != state:
+                self.button_state[btn.action_code] = state
+                dirty.append(btn.rect.inflate(4, 4))
+
+        return None if full else dirty
+
+    def record_frame_time(self, seconds):
+        # rolling average/max of how long drawing + updating the display took,
+        # shown in the status line (refreshed twice a second so the text
+        # itself doesn't make the panel redraw every frame)
+        self.frame_times.append(seconds)
+        now = time.perf_counter()
+        if now - self.frame_report >= 0.5:
+            self.frame_report = now
+            avg = sum(self.frame_times) / len(self.frame_times)
+            self.frame_text = f"Frame: {avg * 1000:.2f} ms (max {max(self.frame_times) * 1000:.2f})"
 
     def run(self):
         while True:
@@ -595,6 +938,7 @@ class NetworkSim:
 
             for event in events:
                 if event.type == pygame.QUIT:
+                    self.stop_simulation()
                     pygame.quit()
                     sys.exit()
                 if self.state == 'MENU':
@@ -602,22 +946,21 @@ class NetworkSim:
                 else:
                     self.handle_sim_events(event)
 
-            if self.state == 'SIMULATION' and not self.paused:
-                self.channel.tick()
-                self.sender.tick_timer()
-                
-                if self.sender.base == self.sender.totalPackets:
-                    print("\n--- SIMULATION DONE ---\n")
-                    self.add_log("DONE!", green)
-                    self.paused = True
+            if self.state == 'SIMULATION':
+                self.sync_simulation()
 
             if self.state == 'MENU':
                 self.draw_menu()
+                pygame.display.flip()
             else:
-                self.draw_simulation()
-
-            pygame.display.flip()
-            self.clock.tick(self.sim_speed)
+                frame_start = time.perf_counter()
+                dirty = self.draw_simulation()
+                if dirty is None:
+                    pygame.display.flip()
+                elif dirty:
+                    pygame.display.update(dirty)
+                self.record_frame_time(time.perf_counter() - frame_start)
+            self.clock.tick(FPS)
 
 if __name__ == "__main__":
     vis = NetworkSim()
@@ -0,0 +1,190 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Structured event tracing. The Sender, Receiver and Channel
+record typed events (send, drop, deliver, ack, ...) as fixed-size binary
+records into a preallocated ring buffer, which can be written out as a
+compact binary trace or as NDJSON. Nothing gets formatted while tracing;
+with no tracer attached the only cost is an `is not None` check.
+
+    python tracer.py run.trace               # print it
+    python tracer.py run.trace --ndjson out.ndjson
+"""
+
+import argparse
+import json
+import struct
+import sys
+
+# event types
+SEND = 1             # sender sent new data         value: packets in flight
+RETRANSMIT = 2       # sender resent a segment      value: 1 if it was a timeout
+DROP = 3             # a packet was lost            value: why, one of the DROP_* reasons
+DELIVER = 4          # receiver got it in order     value: segments delivered in this run
+BUFFER = 5           # receiver buffered it (gap)   value: segments buffered
+ACK_SENT = 6         # receiver sent an ACK         value: advertised window
+ACK = 7              # sender got a new ACK         value: effective window
+DUP_ACK = 8          # sender got a duplicate ACK   value: dup ACKs in a row
+TIMEOUT = 9          # retransmission timer fired   value: the new RTO
+FAST_RETRANSMIT = 10 # 3 dup ACKs                   value: packets in flight
+PROBE = 11           # zero window probe            value: 0
+
+EVENT_NAMES = {
+    SEND: "send",
+    RETRANSMIT: "retransmit",
+    DROP: "drop",
+    DELIVER: "deliver",
+    BUFFER: "buffer",
+    ACK_SENT: "ack_sent",
+    ACK: "ack",
+    DUP_ACK: "dup_ack",
+    TIMEOUT: "timeout",
+    FAST_RETRANSMIT: "fast_retransmit",
+    PROBE: "probe",
+}
+
+# where an event happened
+SENDER = 0
+RECEIVER = 1
+CHANNEL = 2
+SOURCE_NAMES = {SENDER: "sender", RECEIVER: "receiver", CHANNEL: "channel"}
+
+# DROP reasons
+DROP_CONFIG = 0      # in the loss_data / loss_ack lists
+DROP_MODEL = 1       # a channel model (loss, burst, ...)
+DROP_QUEUE = 2       # the bottleneck queue
+DROP_CHECKSUM = 3    # damaged, thrown away by the endpoint
+DROP_OVERFLOW = 4    # no room in the receive buffer
+DROP_NAMES = {DROP_CONFIG: "config", DROP_MODEL: "model", DROP_QUEUE: "queue", DROP_CHECKSUM: "checksum",
+              DROP_OVERFLOW: "overflow"}
+
+# time, event, source, connection id, seq, ack, value
+RECORD = struct.Struct("<dBBHiii")
+MAGIC = b"TCPTRACE"
+FILE_HEADER = struct.Struct("<8sHHQQ")  # magic, version, record size, records, overwritten
+VERSION = 1
+DEFAULT_CAPACITY = 1 << 16
+
+
+class Tracer:
+    # a ring of `capacity` records in one bytearray. once it's full the
+    # oldest records get overwritten (counted in `overwritten`), so a long
+    # run keeps its last `capacity` events at a fixed memory cost.
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buf = bytearray(capacity * RECORD.size)
+        self.pos = 0            # next slot to write
+        self.count = 0          # records held, at most capacity
+        self.overwritten = 0
+
+    def record(self, time, event, source, seq=-1, ack=-1, value=0, conn=0):
+        RECORD.pack_into(self.buf, self.pos * RECORD.size, time, event, source, conn, seq, ack, value)
+        self.pos += 1
+        if self.pos == self.capacity:
+            self.pos = 0
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.overwritten += 1
+
+    def for_conn(self, conn):
+        # a tracer for one of many connections that writes into this ring
+        return ConnTracer(self, conn)
+
+    def __len__(self):
+        return self.count
+
+    def raw(self):
+        # the records, oldest first, as one bytes object
+        size = RECORD.size
+        if self.count < self.capacity:
+            return bytes(self.buf[:self.count * size])
+        cut = self.pos * size
+        return bytes(self.buf[cut:]) + bytes(self.buf[:cut])
+
+    def records(self):
+        # (time, event, source, conn, seq, ack, value) tuples, oldest first
+        return RECORD.iter_unpack(self.raw())
+
+    def clear(self):
+        self.pos = 0
+        self.count = 0
+        self.overwritten = 0
+
+    def dump_binary(self, path):
+        with open(path, "wb") as f:
+            f.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size, self.count, self.overwritten))
+            f.write(self.raw())
+
+    def dump_ndjson(self, path):
+        write_ndjson(self.records(), path)
+
+
+class ConnTracer:
+    # fills in the connection id, for the pairs sharing a MuxChannel
+    __slots__ = ("tracer", "conn")
+
+    def __init__(self, tracer, conn):
+        self.tracer = tracer
+        self.conn = conn
+
+    def record(self, time, event, source, seq=-1, ack=-1, value=0, conn=0):
+        self.tracer.record(time, event, source, seq, ack, value, self.conn)
+
+
+def as_dict(rec):
+    time, event, source, conn, seq, ack, value = rec
+    out = {"t": time, "event": EVENT_NAMES.get(event, event), "src": SOURCE_NAMES.get(source, source),
+           "conn": conn, "seq": seq, "ack": ack, "value": value}
+    if event == DROP:
+        out["reason"] = DROP_NAMES.get(value, value)
+    return out
+
+
+def write_ndjson(records, path):
+    # one JSON object per line
+    with open(path, "w") as f:
+        for rec in records:
+            f.write(json.dumps(as_dict(rec)))
+            f.write("\n")
+
+
+def read_binary(path):
+    # returns (records, overwritten) from a file written by dump_binary()
+    with open(path, "rb") as f:
+        magic, version, size, count, overwritten = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        if version != VERSION or size != RECORD.size:
+            raise ValueError(f"{path}: unsupported trace version {version} (record size {size})")
+        data = f.read(count * size)
+    return list(RECORD.iter_unpack(data)), overwritten
+
+
+def format_record(rec):
+    d = as_dict(rec)
+    what = f"seq {d['seq']}" if d["seq"] >= 0 else f"ack {d['ack']}"
+    extra = d.get("reason", d["value"])
+    return f"{d['t']:>10.1f}  conn {d['conn']:<4} {d['src']:<8} {d['event']:<15} {what:<12} {extra}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a binary trace file.")
+    parser.add_argument("trace")
+    parser.add_argument("--ndjson", default=None, help="convert it to NDJSON instead of printing it")
+    args = parser.parse_args(argv)
+
+    records, overwritten = read_binary(args.trace)
+    if args.ndjson:
+        write_ndjson(records, args.ndjson)
+        return
+    if overwritten:
+        print(f"({overwritten:,} older records were overwritten)")
+    out = sys.stdout
+    for rec in records:
+        out.write(format_record(rec) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Real UDP transport for the Sender and Receiver (asyncio).
+UdpChannel has the same send_to_channel(packet, destination) contract
+as Channel, so the protocol code doesn't change. The sender and
+receiver run as separate processes and the retransmission timer runs
+on the event loop's monotonic clock. An optional userspace "netem"
+shim adds loss and delay using the same models as the simulator.
+
+    python udp_transport.py recv --port 9000 --out copy.bin
+    python udp_transport.py send --port 9000 --file original.bin
+    python udp_transport.py demo --size-mb 20          (both, on localhost)
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+from channel import Channel
+from checksum import get_algorithm
+from congestion import make_cc
+from filetransfer import MSS, FileSender, FileSink, map_file
+from packet import Packet
+from receiver import Receiver
+from simulation import add_model_args, models_from_args
+from wire import PacketEncoder, decode, FLAG_FIN, FLAG_ACK
+
+TICK_SECONDS = 0.001     # one protocol "tick" is a millisecond of real time
+SOCKET_BUFFER = 4 * 1024 * 1024
+FIN_TRIES = 5
+
+
+class AsyncioScheduler:
+    # same interface as EventScheduler, but the clock is the event loop's
+    # monotonic clock (in ticks) and events are loop.call_at() callbacks
+    def __init__(self, loop, tick_seconds=TICK_SECONDS):
+        self.loop = loop
+        self.tick = tick_seconds
+        self.origin = loop.time()
+
+    @property
+    def now(self):
+        return (self.loop.time() - self.origin) / self.tick
+
+    def schedule(self, due, callback, arg=None, priority=0):
+        # priority is ignored, the loop runs callbacks in time order
+        handle = self.loop.call_at(self.origin + due * self.tick, callback, arg)
+        return [due, handle]
+
+    def cancel(self, event):
+        event[1].cancel()
+
+
+class UdpChannel(asyncio.DatagramProtocol):
+    def __init__(self, loop, peer=None, models=None, delay=0, tick_seconds=TICK_SECONDS):
+        self.loop = loop
+        self.scheduler = AsyncioScheduler(loop, tick_seconds)
+        self.tick = tick_seconds
+        self.transport = None
+        self.sock = None
+        self.encoder = PacketEncoder()
+        self.peer = peer           # receiver side learns it from the first datagram
+        self.endpoint = None       # the Sender or Receiver that gets incoming packets
+        self.on_fin = None         # called with (packet, flags) for FIN datagrams
+        # userspace netem shim: extra delay (ticks) and the simulator's models
+        self.models = list(models) if models else []
+        self.delay = delay
+
+        self.sentDatagrams = 0
+        self.sentBytes = 0
+        self.receivedDatagrams = 0
+        self.dropCount = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if self.peer is None:
+            self.peer = addr
+        self.receivedDatagrams += 1
+        packet, flags = decode(data)
+        if flags & FLAG_FIN:
+            if self.on_fin:
+                self.on_fin(packet, flags)
+            return
+        if self.endpoint is not None:
+            self.endpoint.receive(packet)
+
+    def error_received(self, exc):
+        # e.g. ICMP port unreachable if the other side went away. the
+        # retransmission timer deals with it, same as a lost packet.
+        pass
+
+    # --- the Channel contract ---
+
+    def send_to_channel(self, packet, destination_obj=None, flags=0):
+        if self.peer is None:
+            return
+        self.sentDatagrams += 1
+        if not self.models and not self.delay:
+            header, payload = self.encoder.encode(packet, flags)
+            self.sentBytes += len(header) + len(payload)
+            self.write(header, payload)
+            return
+        packet, delays, dropped = Channel.route(packet, self.delay, self.models, None, self.scheduler.now)
+        if dropped is not None:
+            self.dropCount += 1
+            return
+        header, payload = self.encoder.encode(packet, flags)
+        self.sentBytes += len(header) + len(payload)
+        for d in delays:
+            if d <= 0:
+                self.write(header, payload)
+            else:
+                # the encoder's header buffer gets reused, so a delayed copy
+                # has to own its bytes
+                data = bytes(header) + bytes(payload)
+                self.loop.call_later(d * self.tick, self.transport.sendto, data, self.peer)
+
+    def send_batch(self, packets, destination_obj=None):
+        for packet in packets:
+            self.send_to_channel(packet)
+
+    def write(self, header, payload):
+        # header and payload go to the kernel as two buffers (scatter/gather),
+        # so the payload is never joined onto the header in userspace. if the
+        # socket is full, or asyncio already has datagrams queued, fall back to
+        # the transport, which needs one buffer it can hold on to.
+        if self.sock is not None and not self.transport.get_write_buffer_size():
+            try:
+                self.sock.sendmsg((header, payload), (), 0, self.peer)
+                return
+            except (BlockingIOError, InterruptedError):
+                pass
+        self.transport.sendto(bytes(header) + bytes(payload), self.peer)
+
+
+def open_socket(host, port):
+    # we make the socket ourselves so we can call sendmsg() on it directly
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    # bursts of a whole window arrive at once, give the kernel room for them
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+
+async def run_receiver(host, port, out_path, models=None, delay=0, sack=False, ready=None, checksum=None,
+                       window=256, mss=MSS, ack_delay=None):
+    loop = asyncio.get_running_loop()
+    channel = UdpChannel(loop, models=models, delay=delay)
+    # data goes straight to the file as it arrives in order, and only a
+    # window's worth of out-of-order segments is ever held in memory
+    sink = FileSink(out_path, mss)
+    receiver = Receiver(channel, verbose=False, sack=sack, checksum=get_algorithm(checksum),
+                        sink=sink, capacity=window, ackDelay=ack_delay)
+    channel.endpoint = receiver
+    done = loop.create_future()
+
+    def on_fin(packet, flags):
+        # the sender only sends FIN once everything is acked, so by now the
+        # receiver has it all. answer every FIN in case our reply gets lost.
+        channel.send_to_channel(Packet(packet.seqNum, True, receiver.expectedSeqNum), flags=FLAG_FIN)
+        if not done.done() and packet.seqNum == receiver.expectedSeqNum:
+            done.set_result(None)
+
+    channel.on_fin = on_fin
+    channel.sock = open_socket(host, port)
+    transport, _ = await loop.create_datagram_endpoint(lambda: channel, sock=channel.sock)
+    if ready is not None:
+        ready.set()
+    try:
+        await done
+        # stay around a little so a retried FIN still gets its answer
+        await asyncio.sleep(0.2)
+    finally:
+        transport.close()
+        sink.close()
+    return {"packets": receiver.expectedSeqNum, "bytes": sink.bytesWritten,
+            "acks": receiver.ackCount, "duplicates": receiver.duplicateCount, "no room": receiver.overflowCount,
+            "bad checksums": receiver.corruptCount}
+
+
+async def run_sender(host, port, in_path, window=256, timeout=200, mss=MSS,
+                     models=None, delay=0, sack=False, cc=None, checksum=None):
+    loop = asyncio.get_running_loop()
+    # map the file instead of reading it, payloads are slices of the mapping
+    data = map_file(in_path)
+    size = len(data)
+
+    channel = UdpChannel(loop, peer=(host, port), models=models, delay=delay)
+    channel.sock = open_socket("::" if ":" in host else "0.0.0.0", 0)
+    transport, _ = await loop.create_datagram_endpoint(lambda: channel, sock=channel.sock)
+    # a real RTT isn't known up front, so always estimate it
+    sender = FileSender(channel, window, timeout, data, mss, sack=sack, adaptiveRto=True, cc=cc,
+                        checksum=get_algorithm(checksum))
+    channel.endpoint = sender
+
+    finished = loop.create_future()
+    fin_acked = loop.create_future()
+
+    def on_fin(packet, flags):
+        if flags & FLAG_ACK and not fin_acked.done():
+            fin_acked.set_result(None)
+
+    channel.on_fin = on_fin
+    sender.onComplete = lambda: finished.set_result(None)
+
+    start = time.perf_counter()
+    if sender.totalPackets == 0:
+        finished.set_result(None)
+    else:
+        sender.set_auto_send(True)
+    try:
+        await finished
+        elapsed = time.perf_counter() - start
+        # tell the receiver we're done, retrying a few times if the answer is lost
+        fin = Packet(sender.totalPackets, False, -1)
+        for _ in range(FIN_TRIES):
+            channel.send_to_channel(fin, flags=FLAG_FIN)
+            try:
+                await asyncio.wait_for(asyncio.shield(fin_acked), sender.timeoutInterval * TICK_SECONDS * 2)
+                break
+            except asyncio.TimeoutError:
+                continue
+    finally:
+        sender.stop_timer()
+        transport.close()
+        sender.close()
+
+    return {
+        "bytes": size,
+        "packets": sender.totalPackets,
+        "seconds": elapsed,
+        "MB/s": size / elapsed / 1e6 if elapsed else 0.0,
+        "retransmits": sender.retransmitCount,
+        "timeouts": sender.timeoutCount,
+        "datagrams": channel.sentDatagrams,
+        "shim drops": channel.dropCount,
+        "bad checksums": sender.corruptCount,
+        "srtt (ms)": (sender.srtt or 0) * TICK_SECONDS * 1000,
+    }
+
+
+def receiver_process(host, port, out_path, models, delay, sack, ready, checksum, window, mss, ack_delay):
+    asyncio.run(run_receiver(host, port, out_path, models, delay, sack, ready, checksum, window, mss, ack_delay))
+
+
+def print_stats(stats):
+    for key, value in stats.items():
+        print(f"{key:>14}: {value:,.3f}" if isinstance(value, float) else f"{key:>14}: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the protocol over real UDP sockets.")
+    parser.add_argument("mode", choices=["send", "recv", "demo"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--file", help="file to send")
+    parser.add_argument("--out", help="where the receiver writes the file")
+    parser.add_argument("--size-mb", type=float, default=20, help="demo: size of the random test file")
+    parser.add_argument("--window", type=int, default=256)
+    parser.add_argument("--timeout", type=int, default=200, help="initial RTO in ticks (1 tick = 1 ms)")
+    parser.add_argument("--mss", type=int, default=MSS)
+    parser.add_argument("--sack", action="store_true")
+    parser.add_argument("--cc", choices=["none", "reno", "cubic"], default="none")
+    parser.add_argument("--checksum", choices=["none", "inet", "crc32c"], default="none",
+                        help="our own segment checksum, on top of UDP's (use with --corrupt)")
+    parser.add_argument("--delayed-ack", type=int, default=None, metavar="MS",
+                        help="receiver: ACK every 2nd segment or after MS milliseconds")
+    parser.add_argument("--delay", type=int, default=0, help="netem shim: extra one-way delay in ticks")
+    add_model_args(parser)
+    args = parser.parse_args(argv)
+
+    if args.corrupt and args.checksum == "none":
+        # damaged ACK numbers would get believed and the transfer can hang
+        parser.error("--corrupt needs --checksum")
+    models = models_from_args(args)
+
+    if args.mode == "recv":
+        if not args.out:
+            parser.error("recv needs --out")
+        print_stats(asyncio.run(run_receiver(args.host, args.port, args.out, models, args.delay, args.sack,
+                                             checksum=args.checksum, window=args.window, mss=args.mss,
+                                             ack_delay=args.delayed_ack)))
+        return
+
+    if args.mode == "send":
+        if not args.file:
+            parser.error("send needs --file")
+        print_stats(asyncio.run(run_sender(args.host, args.port, args.file, args.window, args.timeout,
+                                           args.mss, models, args.delay, args.sack, make_cc(args.cc),
+                                           args.checksum)))
+        return
+
+    # demo: random file, receiver in another process, sender here, then compare
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "in.bin")
+        dst = os.path.join(tmp, "out.bin")
+        with open(src, "wb") as f:
+            f.write(os.urandom(int(args.size_mb * 1e6)))
+        ready = multiprocessing.Event()
+        proc = multiprocessing.Process(target=receiver_process,
+                                       args=(args.host, args.port, dst, models, args.delay, args.sack, ready,
+                                             args.checksum, args.window, args.mss, args.delayed_ack))
+        proc.start()
+        ready.wait(5)
+        stats = asyncio.run(run_sender(args.host, args.port, src, args.window, args.timeout,
+                                       args.mss, models, args.delay, args.sack, make_cc(args.cc),
+                                       args.checksum))
+        proc.join(10)
+        if proc.is_alive():
+            # e.g. corruption without --checksum, it may never see the whole file
+            proc.terminate()
+        with open(src, "rb") as a:
+            stats["verified"] = os.path.exists(dst) and open(dst, "rb").read() == a.read()
+        print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
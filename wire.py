@@ -0,0 +1,107 @@
+"""
+Name: Alyssa Pinnock
+Course: EEL 4781 - Computer Communication Networks
+Project: Programming Project - Option C (TCP-Like Protocol)
+Description: Binary wire format for Packet, used when the protocol runs
+over a real socket instead of the in-memory Channel.
+
+Header (network byte order, 20 bytes):
+    seqNum   int32
+    ackNum   int32
+    rwnd     uint32   advertised window in segments (all ones = none)
+    flags    uint8    ACK / FIN bits
+    nsack    uint8    number of SACK blocks after the header
+    length   uint16   payload length
+    checksum uint32   see checksum.py (0 when not used)
+followed by nsack (start, end) int32 pairs and then the payload.
+
+Payload bytes are never copied on the way through: the encoder packs
+only the header (into a buffer it reuses) and the payload is sent as
+its own buffer, and decode() hands back the payload as a memoryview
+slice of the datagram.
+"""
+
+import struct
+
+from packet import Packet
+
+HEADER = struct.Struct("!iiIBBHI")
+SACK_BLOCK = struct.Struct("!ii")
+HEADER_SIZE = HEADER.size
+NSACK_OFFSET = 13        # byte offset of the nsack field
+NO_WINDOW = 0xFFFFFFFF
+MAX_SACK_BLOCKS = 64     # extra blocks are left off, like TCP's option space limit
+MAX_PAYLOAD = 65507 - HEADER_SIZE - MAX_SACK_BLOCKS * SACK_BLOCK.size
+
+FLAG_ACK = 0x01
+FLAG_FIN = 0x02
+
+EMPTY = memoryview(b"")
+
+
+def payload_view(data):
+    # packet data as a buffer we can send without copying
+    if data is None:
+        return EMPTY
+    if isinstance(data, str):
+        return memoryview(data.encode())
+    return memoryview(data)
+
+
+def wire_size(packet):
+    # bytes the packet takes up on the wire: header, SACK blocks and payload
+    blocks = packet.sackBlocks
+    nsack = min(len(blocks), MAX_SACK_BLOCKS) if blocks else 0
+    data = packet.data
+    return HEADER_SIZE + nsack * SACK_BLOCK.size + (len(data) if data is not None else 0)
+
+
+class PacketEncoder:
+    # packs headers into one preallocated bytearray. the views it returns are
+    # only good until the next call, so send them straight away.
+    def __init__(self):
+        self.buf = bytearray(HEADER_SIZE + MAX_SACK_BLOCKS * SACK_BLOCK.size)
+        self.view = memoryview(self.buf)
+
+    def header(self, packet, flags=0, length=0, checksum=None):
+        if checksum is None:
+            checksum = packet.checksum
+        if packet.isAck:
+            flags |= FLAG_ACK
+        blocks = packet.sackBlocks or ()
+        if len(blocks) > MAX_SACK_BLOCKS:
+            blocks = blocks[:MAX_SACK_BLOCKS]
+        rwnd = NO_WINDOW if packet.rwnd is None else packet.rwnd
+        HEADER.pack_into(self.buf, 0, packet.seqNum, packet.ackNum, rwnd, flags, len(blocks), length, checksum)
+        offset = HEADER_SIZE
+        for start, end in blocks:
+            SACK_BLOCK.pack_into(self.buf, offset, start, end)
+            offset += SACK_BLOCK.size
+        return self.view[:offset]
+
+    def encode(self, packet, flags=0, checksum=None):
+        # returns (header view, payload view), ready for sendmsg()
+        payload = payload_view(packet.data)
+        return self.header(packet, flags, len(payload), checksum), payload
+
+
+_encoder = PacketEncoder()
+
+
+def encode(packet, flags=0):
+    # the whole datagram as one bytes object (this one does copy)
+    header, payload = _encoder.encode(packet, flags)
+    return bytes(header) + bytes(payload)
+
+
+def decode(buf):
+    # returns (packet, flags). packet.data is a memoryview into buf, no copy
+    seq, ack, rwnd, flags, nsack, length, checksum = HEADER.unpack_from(buf, 0)
+    offset = HEADER_SIZE
+    blocks = None
+    if nsack:
+        blocks = tuple(SACK_BLOCK.unpack_from(buf, offset + SACK_BLOCK.size * i) for i in range(nsack))
+        offset += SACK_BLOCK.size * nsack
+    data = memoryview(buf)[offset:offset + length] if length else None
+    packet = Packet(seq, bool(flags & FLAG_ACK), ack, data, checksum, blocks, None if rwnd == NO_WINDOW else rwnd)
+    return packet, flags